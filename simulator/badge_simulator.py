@@ -7,12 +7,22 @@ Run GitHub Badger 2350 games locally via Pygame by simulating the
 """
 
 import argparse
+import copy
+import gc
+import http.client
+import importlib.machinery
 import importlib.util
+import itertools
 import json
+import marshal
 import math
 import os
+import select
+import socket
 import sys
 import traceback
+import weakref
+from collections import OrderedDict
 from types import ModuleType
 
 try:
@@ -22,6 +32,12 @@ except ImportError:
         "Pygame is required to run the local simulator. Install with: pip install pygame"
     )
 
+# NumPy is optional; it only powers the --numpy rasterizer backend
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
 # -----------------------------------------------------------------------------
 # Virtual “/system” mapping (NO filesystem changes)
 # -----------------------------------------------------------------------------
@@ -67,7 +83,10 @@ _real_chdir = os.chdir
 
 
 def _safe_chdir(path: str):
-    _real_chdir(map_system_path(path))
+    # Paths may also be PathLike (pytest passes Path) or a directory fd
+    if isinstance(path, os.PathLike):
+        path = os.fspath(path)
+    _real_chdir(map_system_path(path) if isinstance(path, str) else path)
 
 
 os.chdir = _safe_chdir  # type: ignore
@@ -165,6 +184,135 @@ sys.path = _SafePathList(sys.path)
 # Badgeware API stubs
 # -----------------------------------------------------------------------------
 
+class _TessellationCache:
+    """Bounded LRU of tessellated outlines shared by identical shapes.
+
+    Apps rebuild the same circles and rounded rectangles every frame; keyed on
+    geometry and segment count, their points are computed once and shared.
+    Builders must return immutable values (tuples or read-only arrays).
+    """
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, build):
+        entries = self._entries
+        points = entries.get(key)
+        if points is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return points
+        self.misses += 1
+        points = build()
+        entries[key] = points
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return points
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return (self.hits / total * 100.0) if total else 0.0
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_tessellation_cache = _TessellationCache()
+
+
+def _png_format(path: str):
+    """Badge pixel format of an image file: ("p8", palette entries) for an
+    indexed PNG, ("rgba8888", 0) for one with alpha, else ("rgb565", 0).
+
+    Only the header chunks are read; files that are not PNGs count as rgb565.
+    """
+    import struct
+    try:
+        with _real_open(path, "rb") as fh:
+            if fh.read(8) != b"\x89PNG\r\n\x1a\n":
+                return "rgb565", 0
+            color_type = None
+            while True:
+                chunk = fh.read(8)
+                if len(chunk) < 8:
+                    break
+                length, kind = struct.unpack(">I4s", chunk)
+                if kind == b"IHDR":
+                    color_type = fh.read(length)[9]
+                    fh.seek(4, os.SEEK_CUR)
+                    continue
+                if kind == b"PLTE" and color_type == 3:
+                    return "p8", length // 3
+                if kind == b"tRNS":
+                    return "rgba8888", 0
+                if kind == b"IDAT":
+                    break
+                fh.seek(length + 4, os.SEEK_CUR)
+    except (OSError, IndexError, struct.error):
+        return "rgb565", 0
+    if color_type in (4, 6):
+        return "rgba8888", 0
+    return "rgb565", 0
+
+
+class _ImageCache:
+    """Byte-budgeted LRU of decoded images, shared across app switches.
+
+    Keyed on path and modification time, so an edited asset is decoded again.
+    Cached surfaces are shared by every Image.load() result and must never be
+    drawn into; Image copies its pixels before the first write. Each entry
+    also keeps the file's badge pixel format (see _png_format).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, path: str):
+        """(surface, (pixel format, palette entries)) for the image at `path`."""
+        key = (path, os.stat(path).st_mtime_ns)
+        entries = self._entries
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        surface = pygame.image.load(path).convert_alpha()
+        entry = entries[key] = (surface, _png_format(path))
+        self.resident_bytes += self._size(surface)
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self.resident_bytes > self.max_bytes and len(entries) > 1:
+            _, (evicted, _) = entries.popitem(last=False)
+            self.resident_bytes -= self._size(evicted)
+        return entry
+
+    @staticmethod
+    def _size(surface: pygame.Surface) -> int:
+        return surface.get_height() * surface.get_pitch()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return (self.hits / total * 100.0) if total else 0.0
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+_image_cache = _ImageCache()
+
+
 class _Shape:
     """Base shape that supports optional affine transforms."""
 
@@ -176,6 +324,10 @@ class _Shape:
     def points(self):
         raise NotImplementedError
 
+    def point_array(self):
+        """Outline as an (N, 2) float NumPy array (used by the --numpy backend)."""
+        return np.asarray(self.points(), dtype=float).reshape(-1, 2)
+
     def stroke(self, width: float):
         return _StrokedShape(self, width)
 
@@ -207,6 +359,13 @@ class _Rectangle(_Shape):
             (x, y + h),
         ]
 
+    def point_array(self):
+        x, y, w, h = self.x, self.y, self.w, self.h
+        return np.array(
+            [[x, y], [x + w, y], [x + w, y + h], [x, y + h]],
+            dtype=float,
+        )
+
 
 class _RoundedRectangle(_Rectangle):
     __slots__ = ("radii",)
@@ -222,6 +381,10 @@ class _RoundedRectangle(_Rectangle):
         self.radii = [max(0.0, float(r)) for r in radii]
 
     def points(self):
+        key = ("rounded_rectangle", self.x, self.y, self.w, self.h, tuple(self.radii))
+        return _tessellation_cache.get(key, self._tessellate)
+
+    def _tessellate(self):
         x, y, w, h = self.x, self.y, self.w, self.h
         radii = [
             min(r, w / 2.0, h / 2.0) if r > 0 else 0.0
@@ -260,7 +423,10 @@ class _RoundedRectangle(_Rectangle):
                 px = cx + radius * math.cos(angle)
                 py = cy + radius * math.sin(angle)
                 points.append((px, py))
-        return points
+        return tuple(points)
+
+    def point_array(self):
+        return _Shape.point_array(self)
 
 
 class _Circle(_Shape):
@@ -272,6 +438,10 @@ class _Circle(_Shape):
         self.segments = max(12, int(segments))
 
     def points(self):
+        key = ("circle", self.x, self.y, self.radius, self.segments)
+        return _tessellation_cache.get(key, self._tessellate)
+
+    def _tessellate(self):
         pts = []
         for i in range(self.segments):
             theta = (2.0 * math.pi * i) / self.segments
@@ -281,6 +451,19 @@ class _Circle(_Shape):
                     self.y + self.radius * math.sin(theta),
                 )
             )
+        return tuple(pts)
+
+    def point_array(self):
+        key = ("circle_array", self.x, self.y, self.radius, self.segments)
+        return _tessellation_cache.get(key, self._tessellate_array)
+
+    def _tessellate_array(self):
+        theta = (2.0 * math.pi * np.arange(self.segments)) / self.segments
+        pts = np.column_stack((
+            self.x + self.radius * np.cos(theta),
+            self.y + self.radius * np.sin(theta),
+        ))
+        pts.setflags(write=False)
         return pts
 
 
@@ -294,6 +477,10 @@ class _Squircle(_Shape):
         self.segments = max(24, int(segments))
 
     def points(self):
+        key = ("squircle", self.x, self.y, self.radius, self.n, self.segments)
+        return _tessellation_cache.get(key, self._tessellate)
+
+    def _tessellate(self):
         pts = []
         exponent = 2.0 / max(1e-3, float(self.n))
         for i in range(self.segments):
@@ -303,6 +490,21 @@ class _Squircle(_Shape):
             px = self.radius * math.copysign(abs(cos_t) ** exponent, cos_t)
             py = self.radius * math.copysign(abs(sin_t) ** exponent, sin_t)
             pts.append((self.x + px, self.y + py))
+        return tuple(pts)
+
+    def point_array(self):
+        key = ("squircle_array", self.x, self.y, self.radius, self.n, self.segments)
+        return _tessellation_cache.get(key, self._tessellate_array)
+
+    def _tessellate_array(self):
+        exponent = 2.0 / max(1e-3, float(self.n))
+        theta = (2.0 * math.pi * np.arange(self.segments)) / self.segments
+        cos_t = np.cos(theta)
+        sin_t = np.sin(theta)
+        px = self.radius * np.copysign(np.abs(cos_t) ** exponent, cos_t)
+        py = self.radius * np.copysign(np.abs(sin_t) ** exponent, sin_t)
+        pts = np.column_stack((self.x + px, self.y + py))
+        pts.setflags(write=False)
         return pts
 
 
@@ -333,6 +535,13 @@ class _RegularPolygon(_Shape):
             pts.append((px, py))
         return pts
 
+    def point_array(self):
+        angle = np.radians((360.0 / self.sides) * np.arange(self.sides))
+        return np.column_stack((
+            self.x + self.radius * np.sin(angle),
+            self.y + self.radius * np.cos(angle),
+        ))
+
 
 class _Arc(_Shape):
     __slots__ = ("x", "y", "radius", "start_deg", "end_deg", "thickness")
@@ -351,6 +560,10 @@ class _Arc(_Shape):
             end += 360.0
         span = max(0.0, end - start)
         segments = max(8, int(self.radius * max(1.0, span / 45.0)))
+        key = ("arc", self.x, self.y, self.radius, start, span, segments)
+        return _tessellation_cache.get(key, lambda: self._tessellate(start, span, segments))
+
+    def _tessellate(self, start, span, segments):
         pts = []
         for i in range(segments + 1):
             t = i / segments if segments else 0.0
@@ -358,7 +571,7 @@ class _Arc(_Shape):
             px = self.x + self.radius * math.sin(angle)
             py = self.y + self.radius * math.cos(angle)
             pts.append((px, py))
-        return pts
+        return tuple(pts)
 
     def stroke(self, width: float):
         stroked = _Arc(self.x, self.y, self.radius, self.start_deg, self.end_deg, width)
@@ -374,17 +587,72 @@ class _Pie(_Arc):
         super().__init__(x, y, radius, start_deg, end_deg, thickness=1.0)
 
     def points(self):
-        pts = super().points()
-        if pts:
-            return [(self.x, self.y)] + pts
-        return [(self.x, self.y)]
+        return ((self.x, self.y),) + super().points()
+
 
+def _transform_points(points, transform, ox, oy):
+    """Apply `transform`, then the window offset, and round, in one pass.
+
+    Same operation order as Matrix.transformed_point followed by the offset,
+    so vertices match exactly; translation-only matrices skip the multiplies.
+    """
+    if not isinstance(transform, Matrix):
+        return [(int(round(px + ox)), int(round(py + oy))) for px, py in points]
+    a, b, c, d, tx, ty = transform.a, transform.b, transform.c, transform.d, transform.tx, transform.ty
+    if a == 1 and b == 0 and c == 0 and d == 1:
+        return [(int(round(px + tx + ox)), int(round(py + ty + oy))) for px, py in points]
+    return [(int(round(a * px + c * py + tx + ox)), int(round(b * px + d * py + ty + oy)))
+            for px, py in points]
+
+
+# Placed (transformed, offset, rounded) outlines of curved shapes, keyed on
+# the tessellated outline and every coefficient that moved it
+_placement_cache = _TessellationCache(maxsize=256)
+
+
+def _place_points(points, transform, ox=0.0, oy=0.0):
+    """Integer vertices for `points` under `transform` and offset (ox, oy)."""
+    if type(points) is not tuple or len(points) < 16:
+        return _transform_points(points, transform, ox, oy)
+    if isinstance(transform, Matrix):
+        key = (points, transform.a, transform.b, transform.c, transform.d,
+               transform.tx, transform.ty, ox, oy)
+    else:
+        key = (points, ox, oy)
+    return _placement_cache.get(key, lambda: tuple(_transform_points(points, transform, ox, oy)))
 
-def _round_points(points):
-    return [(int(round(px)), int(round(py))) for px, py in points]
+
+def _axis_rect(shape):
+    """Pixels covered by a filled, unrotated _Rectangle as (x, y, w, h), or None.
+
+    Only plain rectangles with no transform or a Matrix without rotation or
+    shear qualify. Matches pygame.draw.polygon, which fills inclusive of both
+    edges, and Matrix.transformed_point's rounding.
+    """
+    if type(shape) is not _Rectangle:
+        return None
+    x, y = shape.x, shape.y
+    x2, y2 = x + shape.w, y + shape.h
+    m = shape.transform
+    if isinstance(m, Matrix):
+        if m.b != 0 or m.c != 0:
+            return None
+        if m.a == 1 and m.d == 1:
+            x, y, x2, y2 = x + m.tx, y + m.ty, x2 + m.tx, y2 + m.ty
+        else:
+            x, y = m.a * x + m.tx, m.d * y + m.ty
+            x2, y2 = m.a * x2 + m.tx, m.d * y2 + m.ty
+    x, x2 = int(round(x)), int(round(x2))
+    y, y2 = int(round(y)), int(round(y2))
+    if x2 < x:
+        x, x2 = x2, x
+    if y2 < y:
+        y, y2 = y2, y
+    return (x, y, x2 - x + 1, y2 - y + 1)
 
 
 def _render_shape(surface, color, shape, transform=None, offset=(0.0, 0.0)):
+    """Rasterize `shape` onto `surface`; returns the affected Rect or None."""
     base_shape = shape
     stroke_width = None
 
@@ -406,79 +674,519 @@ def _render_shape(surface, color, shape, transform=None, offset=(0.0, 0.0)):
             x1, y1 = transform.transformed_point(x1, y1)
             x2, y2 = transform.transformed_point(x2, y2)
         width = stroke_width if stroke_width is not None else base_shape.thickness
-        pygame.draw.line(
+        return pygame.draw.line(
             surface,
             color,
             (int(round(x1 + ox)), int(round(y1 + oy))),
             (int(round(x2 + ox)), int(round(y2 + oy))),
             max(1, int(round(width))),
         )
-        return
 
     if isinstance(base_shape, _Pie):
         points = base_shape.points()
-        if isinstance(transform, Matrix):
-            points = [transform.transformed_point(px, py) for px, py in points]
-        points = [(px + ox, py + oy) for px, py in points]
         if not points:
-            return
+            return None
+        points = _place_points(points, transform, ox, oy)
         if stroke_width is not None and stroke_width > 0:
-            pygame.draw.polygon(
+            return pygame.draw.polygon(
                 surface,
                 color,
-                _round_points(points),
+                points,
                 max(1, int(round(stroke_width))),
             )
-        else:
-            pygame.draw.polygon(surface, color, _round_points(points))
-        return
+        return pygame.draw.polygon(surface, color, points)
 
     if isinstance(base_shape, _Arc):
         points = base_shape.points()
-        if isinstance(transform, Matrix):
-            points = [transform.transformed_point(px, py) for px, py in points]
-        points = [(px + ox, py + oy) for px, py in points]
         if len(points) >= 2:
             width = stroke_width if stroke_width is not None else base_shape.thickness
-            pygame.draw.lines(
+            return pygame.draw.lines(
                 surface,
                 color,
                 False,
-                _round_points(points),
+                _place_points(points, transform, ox, oy),
                 max(1, int(round(width))),
             )
-        return
+        return None
 
     if not hasattr(base_shape, "points"):
-        return
+        return None
 
-    points = list(base_shape.points())
+    points = base_shape.points()
     if not points:
-        return
-
-    if isinstance(transform, Matrix):
-        points = [transform.transformed_point(px, py) for px, py in points]
-    points = [(px + ox, py + oy) for px, py in points]
+        return None
+    points = _place_points(points, transform, ox, oy)
 
     if stroke_width is not None and stroke_width > 0:
-        pygame.draw.polygon(
+        return pygame.draw.polygon(
             surface,
             color,
-            _round_points(points),
+            points,
             max(1, int(round(stroke_width))),
         )
+    return pygame.draw.polygon(surface, color, points)
+
+
+def _render_shape_numpy(surface, color, shape, transform=None, offset=(0.0, 0.0)):
+    """NumPy variant of _render_shape for polygon shapes.
+
+    Filled rectangles that stay axis aligned skip vertex generation and are
+    written straight into the pixels via pygame.surfarray. Other polygons get
+    their points from point_array(), transformed and rounded in bulk. Lines
+    and open arcs fall back to _render_shape. Returns the affected Rect or None.
+    """
+    base_shape = shape
+    stroke_width = None
+
+    if isinstance(shape, _StrokedShape):
+        base_shape = shape.shape
+        stroke_width = shape.width
+        if transform is None:
+            transform = getattr(shape, "transform", None)
+
+    if transform is None:
+        transform = getattr(base_shape, "transform", None)
+
+    if isinstance(base_shape, _Line) or (isinstance(base_shape, _Arc) and not isinstance(base_shape, _Pie)):
+        return _render_shape(surface, color, shape, transform, offset)
+
+    if not hasattr(base_shape, "points"):
+        return None
+
+    ox, oy = offset
+    is_matrix = isinstance(transform, Matrix)
+    filled = stroke_width is None or stroke_width <= 0
+
+    if (filled and type(base_shape) is _Rectangle and surface.get_bytesize() == 4
+            and (not is_matrix or (transform.b == 0 and transform.c == 0))):
+        # Opposite corners are enough when the transform has no rotation or
+        # shear; pygame.draw.polygon fills inclusive of both edges.
+        x, y = base_shape.x, base_shape.y
+        x2, y2 = x + base_shape.w, y + base_shape.h
+        if is_matrix:
+            x, y = transform.transformed_point(x, y)
+            x2, y2 = transform.transformed_point(x2, y2)
+        x, x2 = int(round(x + ox)), int(round(x2 + ox))
+        y, y2 = int(round(y + oy)), int(round(y2 + oy))
+        if x2 < x:
+            x, x2 = x2, x
+        if y2 < y:
+            y, y2 = y2, y
+        rect = pygame.Rect(x, y, x2 - x + 1, y2 - y + 1).clip(surface.get_clip())
+        if rect.width > 0 and rect.height > 0:
+            pixels = pygame.surfarray.pixels2d(surface)
+            pixels[rect.left:rect.right, rect.top:rect.bottom] = surface.map_rgb(color) & 0xFFFFFFFF
+            del pixels
+        return rect
+
+    pts = base_shape.point_array()
+    if not len(pts):
+        return None
+
+    if is_matrix and transform.a == 1 and transform.b == 0 and transform.c == 0 and transform.d == 1:
+        pts = pts + (transform.tx, transform.ty)
+    elif is_matrix:
+        # Single 2x3 affine over all vertices, in the same operation order as
+        # Matrix.transformed_point so rounding matches the Python path
+        xs = pts[:, 0]
+        ys = pts[:, 1]
+        pts = np.column_stack((
+            transform.a * xs + transform.c * ys + transform.tx,
+            transform.b * xs + transform.d * ys + transform.ty,
+        ))
+    if ox or oy:
+        pts = pts + (ox, oy)
+    points = np.rint(pts).astype(np.int64).tolist()
+
+    if filled:
+        return pygame.draw.polygon(surface, color, points)
+    return pygame.draw.polygon(surface, color, points, max(1, int(round(stroke_width))))
+
+
+# Rasterizer used by draw(); main() swaps in _render_shape_numpy for --numpy
+_rasterize = _render_shape
+
+
+def _shape_bounds(shape, offset=(0.0, 0.0)):
+    """Conservative pixel Rect around everything _render_shape could touch."""
+    base_shape = shape
+    pad = 1.0
+    if isinstance(shape, _StrokedShape):
+        base_shape = shape.shape
+        pad += shape.width
+    transform = getattr(shape, "transform", None) or getattr(base_shape, "transform", None)
+
+    if isinstance(base_shape, _Line):
+        points = [(base_shape.x1, base_shape.y1), (base_shape.x2, base_shape.y2)]
+        pad += base_shape.thickness
+    elif hasattr(base_shape, "points"):
+        points = list(base_shape.points())
+        if isinstance(base_shape, _Arc):
+            pad += base_shape.thickness
+    else:
+        return None
+    if not points:
+        return None
+    if isinstance(transform, Matrix):
+        points = [transform.transformed_point(px, py) for px, py in points]
+
+    xs = [px for px, _ in points]
+    ys = [py for _, py in points]
+    left = math.floor(min(xs) + offset[0] - pad)
+    top = math.floor(min(ys) + offset[1] - pad)
+    right = math.ceil(max(xs) + offset[0] + pad)
+    bottom = math.ceil(max(ys) + offset[1] + pad)
+    return pygame.Rect(left, top, right - left + 1, bottom - top + 1)
+
+
+class _ScratchLayers:
+    """Transparent layers, one per target size, reused for compositing.
+
+    A layer shares its target's coordinates, so shapes rasterize exactly as
+    they would directly; only the shape's bounding box is cleared and blitted.
+    """
+
+    def __init__(self) -> None:
+        self._layers = {}
+
+    def get(self, size, area: pygame.Rect) -> pygame.Surface:
+        layer = self._layers.get(size)
+        if layer is None:
+            layer = self._layers[size] = pygame.Surface(size, pygame.SRCALPHA)
+        layer.set_clip(area)
+        layer.fill((0, 0, 0, 0))  # fill honours the clip
+        return layer
+
+
+_scratch_layers = _ScratchLayers()
+
+
+class _XorBrush(tuple):
+    """Brush colour whose RGB is XORed into the destination (see brushes.xor)."""
+
+    __slots__ = ()
+
+
+def _render_blended(surface, color, shape, offset=(0.0, 0.0)):
+    """Rasterize `shape` with a translucent colour, alpha-blended onto `surface`.
+
+    pygame.draw writes RGBA values straight into the pixels, so the shape is
+    drawn into a scratch layer first and blitted over the destination.
+    Returns the affected Rect or None.
+    """
+    bounds = _shape_bounds(shape, offset)
+    if bounds is None:
+        return None
+    area = bounds.clip(surface.get_clip())
+    if not area:
+        return None
+    layer = _scratch_layers.get(surface.get_size(), area)
+    _rasterize(layer, color, shape, offset=offset)
+    return surface.blit(layer, area.topleft, area)
+
+
+def _render_xor(surface, color, shape, offset=(0.0, 0.0)):
+    """Rasterize `shape` by XORing the colour's RGB into the covered pixels.
+
+    The shape is drawn into a scratch layer as a coverage mask and applied
+    through pygame.surfarray. Without NumPy the shape is drawn in the solid
+    colour instead. Returns the affected Rect or None.
+    """
+    if np is None or surface.get_bytesize() != 4:
+        return _rasterize(surface, tuple(color), shape, offset=offset)
+    bounds = _shape_bounds(shape, offset)
+    if bounds is None:
+        return None
+    area = bounds.clip(surface.get_clip())
+    if not area:
+        return None
+    layer = _scratch_layers.get(surface.get_size(), area)
+    _rasterize(layer, (255, 255, 255, 255), shape, offset=offset)
+    coverage = pygame.surfarray.pixels_alpha(layer)
+    mask = coverage[area.left:area.right, area.top:area.bottom] != 0
+    del coverage
+    # Alpha 0 maps to an RGB-only bit pattern, leaving destination alpha alone
+    bits = np.uint32(surface.map_rgb((color[0], color[1], color[2], 0)) & 0xFFFFFFFF)
+    pixels = pygame.surfarray.pixels2d(surface)
+    region = pixels[area.left:area.right, area.top:area.bottom]
+    region[mask] ^= bits
+    del region, pixels
+    return area
+
+
+def _scaled_strokes(shape, factor: int):
+    """Copy of `shape` with stroke widths and line thicknesses scaled by `factor`."""
+    if isinstance(shape, _StrokedShape):
+        scaled = copy.copy(shape)
+        scaled.width = shape.width * factor
+        return scaled
+    if isinstance(shape, (_Line, _Arc)):
+        scaled = copy.copy(shape)
+        scaled.thickness = shape.thickness * factor
+        return scaled
+    return shape
+
+
+def _bucket(size: int) -> int:
+    """Round a scratch dimension up to a power of two so few layers are pooled."""
+    return max(64, 1 << (size - 1).bit_length())
+
+
+def _render_supersampled(surface, color, shape, factor: int, offset=(0.0, 0.0)):
+    """Rasterize `shape` antialiased, emulating Image.X2 / Image.X4.
+
+    The shape's coverage is drawn `factor` times larger into a scratch layer,
+    box-filtered down over factor x factor blocks with NumPy, and blended onto
+    `surface` in the brush colour. Returns the affected Rect or None.
+    """
+    bounds = _shape_bounds(shape, offset)
+    if bounds is None:
+        return None
+    area = bounds.clip(surface.get_clip())
+    if not area:
+        return None
+    w, h = area.size
+    fw, fh = w * factor, h * factor
+    layer = _scratch_layers.get((_bucket(fw), _bucket(fh)), pygame.Rect(0, 0, fw, fh))
+
+    # Shape transform, then the window offset, then into the layer's subpixels
+    placement = Matrix(factor, 0.0, 0.0, factor,
+                       (offset[0] - area.x) * factor, (offset[1] - area.y) * factor)
+    transform = getattr(shape, "transform", None)
+    if transform is None and isinstance(shape, _StrokedShape):
+        transform = getattr(shape.shape, "transform", None)
+    if isinstance(transform, Matrix):
+        placement.multiply(transform)
+    _rasterize(layer, (255, 255, 255, 255), _scaled_strokes(shape, factor), transform=placement)
+
+    samples = pygame.surfarray.pixels_alpha(layer)
+    coverage = samples[:fw, :fh].reshape(w, factor, h, factor).sum(axis=(1, 3), dtype=np.uint32)
+    del samples
+    brush_alpha = color[3] if len(color) == 4 else 255
+    tint = pygame.Surface((w, h), pygame.SRCALPHA)
+    tint.fill((color[0], color[1], color[2], 255))
+    alpha = pygame.surfarray.pixels_alpha(tint)
+    alpha[...] = (coverage * brush_alpha + factor * factor * 127) // (factor * factor * 255)
+    del alpha
+    return surface.blit(tint, area.topleft)
+
+
+def _coarse_bounds(shape, offset=(0.0, 0.0)):
+    """Conservative pixel Rect from a shape's parameters, without tessellating.
+
+    Transformed shapes are bounded by their transformed bounding box. Returns
+    None for shapes it does not know.
+    """
+    base_shape = shape
+    pad = 2.0
+    if isinstance(shape, _StrokedShape):
+        base_shape = shape.shape
+        pad += shape.width
+    transform = getattr(shape, "transform", None) or getattr(base_shape, "transform", None)
+
+    if isinstance(base_shape, _Line):
+        xs = (base_shape.x1, base_shape.x2)
+        ys = (base_shape.y1, base_shape.y2)
+        pad += base_shape.thickness
+    elif isinstance(base_shape, _Rectangle):
+        xs = (base_shape.x, base_shape.x + base_shape.w)
+        ys = (base_shape.y, base_shape.y + base_shape.h)
+    elif isinstance(base_shape, (_Circle, _Squircle, _RegularPolygon, _Arc)):
+        r = abs(base_shape.radius)
+        xs = (base_shape.x - r, base_shape.x + r)
+        ys = (base_shape.y - r, base_shape.y + r)
+        if isinstance(base_shape, _Arc):
+            pad += base_shape.thickness
     else:
-        pygame.draw.polygon(surface, color, _round_points(points))
+        return None
+    if isinstance(transform, Matrix):
+        corners = [transform.transformed_point(px, py) for px in xs for py in ys]
+        xs = [px for px, _ in corners]
+        ys = [py for _, py in corners]
+
+    left = math.floor(min(xs) + offset[0] - pad)
+    top = math.floor(min(ys) + offset[1] - pad)
+    right = math.ceil(max(xs) + offset[0] + pad)
+    bottom = math.ceil(max(ys) + offset[1] + pad)
+    return pygame.Rect(left, top, right - left + 1, bottom - top + 1)
+
+
+def _draw_shape(surface, color, shape, offset=(0.0, 0.0), antialias=0):
+    """Rasterize `shape` with the brush's compositing: XOR, alpha blend or plain.
+
+    Shapes that cannot reach the surface's clip are dropped before they are
+    tessellated. A non-zero `antialias` (Image.X2 / Image.X4) supersamples
+    when NumPy is available.
+    """
+    bounds = _coarse_bounds(shape, offset)
+    if bounds is not None and not bounds.colliderect(surface.get_clip()):
+        return None
+    if antialias and np is not None and not isinstance(color, _XorBrush):
+        return _render_supersampled(surface, color, shape, 2 ** min(int(antialias), 2), offset)
+    if isinstance(color, _XorBrush):
+        return _render_xor(surface, color, shape, offset)
+    if len(color) == 3 or color[3] == 255:
+        return _rasterize(surface, color, shape, offset=offset)
+    return _render_blended(surface, color, shape, offset)
+
+
+# Per-class slot names used by _shape_signature
+_signature_fields = {}
+
+
+def _shape_signature(shape):
+    """Hashable value covering everything that affects how `shape` draws."""
+    cls = type(shape)
+    fields = _signature_fields.get(cls)
+    if fields is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(getattr(klass, "__slots__", ()))
+        fields = _signature_fields[cls] = tuple(names)
+    values = [cls]
+    for name in fields:
+        value = getattr(shape, name, None)
+        if isinstance(value, Matrix):
+            value = (value.a, value.b, value.c, value.d, value.tx, value.ty)
+        elif isinstance(value, _Shape):
+            value = _shape_signature(value)
+        elif isinstance(value, list):
+            value = tuple(value)
+        values.append(value)
+    return tuple(values)
 
 
 class _SurfaceTarget:
-    __slots__ = ("_surface", "brush", "font", "antialias")
+    __slots__ = ("_surface", "brush", "font", "antialias", "_serial", "_version", "_draw_list",
+                 "_covered", "_fills", "_fill_color", "_clip")
+
+    _serials = itertools.count()
 
     def __init__(self, surface: pygame.Surface):
         self._surface = surface
         self.brush = brushes.color(255, 255, 255)
         self.font = pygame.font.Font(None, 14)
         self.antialias = 0
+        # (serial, version) identifies this target's pixels when it is blitted
+        self._serial = next(_SurfaceTarget._serials)
+        self._version = 0
+        # Only the Screen retains a per-frame list of (signature, rect) ops
+        self._draw_list = None
+        # Whether this frame's ops have overwritten every pixel (see _record)
+        self._covered = False
+        # Opaque axis-aligned rectangles queued by draw(), all in _fill_color
+        self._fills = []
+        self._fill_color = None
+        # Clip left on the surface by the last window op; None when unclipped
+        self._clip = None
+
+    def _record(self, rect, signature, blends=False) -> None:
+        """Note a pixel change; the Screen keeps the op for present() to diff.
+
+        `blends` marks ops whose result depends on the pixels already there
+        (XOR, translucent brushes, antialiasing, sources with alpha). They
+        only repeat last frame's pixels if they land on the same pixels, which
+        holds once the frame has overwritten the whole surface (with clear()
+        or a full-screen opaque fill); before that they never compare equal.
+        """
+        self._version += 1
+        if self._draw_list is not None and rect:
+            if blends and not self._covered:
+                signature = (signature, object())
+            elif signature[0] in ("clear", "fill") and rect == self._surface.get_rect():
+                self._covered = True
+            self._draw_list.append((signature, rect))
+
+    def _record_shape(self, rect, color, shape, window=None) -> None:
+        # An XOR brush compares equal to the plain colour tuple
+        xor = isinstance(color, _XorBrush)
+        blends = xor or bool(self.antialias) or (len(color) == 4 and color[3] != 255)
+        self._record(rect, ("draw", window, color, xor, self.antialias, _shape_signature(shape)), blends)
+
+    @staticmethod
+    def _blends(source) -> bool:
+        """Whether blitting `source` mixes it with the pixels underneath."""
+        return bool(source.get_flags() & pygame.SRCALPHA or source.get_alpha() is not None
+                    or source.get_colorkey() is not None)
+
+    @staticmethod
+    def _source_signature(image):
+        if isinstance(image, _SurfaceTarget):
+            view = getattr(image, "_view", None)
+            if view is not None:
+                # A sprite frame changes whenever its sheet does
+                return (image._serial, image._version, view[0]._serial, view[0]._version)
+            return (image._serial, image._version)
+        # Raw surfaces can change behind our back; never match them
+        return object()
+
+    def _pixels(self) -> pygame.Surface:
+        """Surface to draw into, with queued fills applied.
+
+        Image extends this for copy-on-write. Anything that reads or writes the
+        pixels must go through here (or _unwrap) rather than _surface.
+        """
+        if self._fills:
+            self._flush_fills()
+        if self._clip is not None:
+            self._set_clip(None)
+        return self._surface
+
+    def _set_clip(self, clip) -> None:
+        self._surface.set_clip(clip)
+        self._clip = clip
+
+    def _window_pixels(self, clip: pygame.Rect) -> pygame.Surface:
+        """Surface for a window op, clipped to `clip`.
+
+        The clip stays set afterwards, so consecutive ops on the same window
+        change nothing; the target's own ops reset it in _pixels().
+        """
+        if self._fills:
+            self._flush_fills()
+        if clip != self._clip:
+            self._set_clip(clip)
+        return self._surface
+
+    def _queue_fill(self, color, rect) -> None:
+        """Queue an opaque rectangle fill, merging it into the previous one
+        when both have the same colour and form a single rectangle.
+
+        The op is recorded now, so the draw list keeps the order the app
+        issued it in, even though the pixels are written later.
+        """
+        self._record(self._surface.get_rect().clip(rect), ("fill", color, rect))
+        fills = self._fills
+        if fills and color != self._fill_color:
+            self._flush_fills()
+        if fills:
+            x, y, w, h = rect
+            lx, ly, lw, lh = fills[-1]
+            if ly == y and lh == h and x <= lx + lw and lx <= x + w:
+                left = min(x, lx)
+                fills[-1] = (left, y, max(x + w, lx + lw) - left, h)
+                return
+            if lx == x and lw == w and y <= ly + lh and ly <= y + h:
+                top = min(y, ly)
+                fills[-1] = (x, top, w, max(y + h, ly + lh) - top)
+                return
+        self._fill_color = color
+        fills.append(rect)
+
+    def _flush_fills(self) -> None:
+        surface = self._surface
+        color = self._fill_color
+        # Fills were queued by the target's own ops, which are never clipped
+        if self._clip is not None:
+            self._set_clip(None)
+        clip = surface.get_clip()
+        for rect in self._fills:
+            # Surface.fill shifts rects with a negative origin instead of
+            # cropping them, so clip first
+            area = clip.clip(rect)
+            if area:
+                surface.fill(color, area)
+        self._fills.clear()
 
     def _norm_color(self, c):
         if c is None:
@@ -488,20 +1196,43 @@ class _SurfaceTarget:
         return c
 
     def _unwrap(self, image):
-        return image._surface if isinstance(image, Image) else image
+        if isinstance(image, Image):
+            return image._source()
+        return image
 
     def clear(self, color=None) -> None:
         fill_color = self._norm_color(color if color is not None else self.brush)
-        self._surface.fill(fill_color)
+        rect = self._pixels().fill(fill_color)
+        if _frame_cost is not None:
+            _frame_cost.fill(rect)
+        self._record(rect, ("clear", fill_color))
 
     def draw(self, shape: _Shape) -> None:
         color = self._norm_color(self.brush)
-        _render_shape(self._surface, color, shape)
+        antialias = self.antialias
+        if not antialias and type(color) is tuple and (len(color) == 3 or color[3] == 255):
+            rect = _axis_rect(shape)
+            if rect is not None:
+                if _frame_cost is not None:
+                    area = self._surface.get_rect().clip(rect)
+                    if area:
+                        _frame_cost.shape(shape, None, color)
+                        _frame_cost.fill(area)
+                self._queue_fill(color, rect)
+                return
+        rect = _draw_shape(self._pixels(), color, shape, antialias=antialias)
+        if _frame_cost is not None and rect:
+            _frame_cost.shape(shape, rect, color, antialias)
+        self._record_shape(rect, color, shape)
 
     def blit(self, image, x: float, y: float, transform: "Matrix" = None) -> None:
         if isinstance(transform, Matrix):
             x, y = transform.transformed_point(x, y)
-        self._surface.blit(self._unwrap(image), (int(round(x)), int(round(y))))
+        src = self._unwrap(image)
+        rect = self._pixels().blit(src, (int(round(x)), int(round(y))))
+        if _frame_cost is not None:
+            _frame_cost.blit(rect)
+        self._record(rect, ("blit", self._source_signature(image)), self._blends(src))
 
     def scale_blit(self, image, x: float, y: float, w: int, h: int, transform: "Matrix" = None) -> None:
         if isinstance(transform, Matrix):
@@ -514,13 +1245,20 @@ class _SurfaceTarget:
             scaled = pygame.transform.flip(scaled, True, False)
         if h < 0:
             scaled = pygame.transform.flip(scaled, False, True)
-        self._surface.blit(scaled, (int(round(x)), int(round(y))))
+        rect = self._pixels().blit(scaled, (int(round(x)), int(round(y))))
+        if _frame_cost is not None:
+            _frame_cost.blit(rect, scaled=True)
+        self._record(rect, ("scale_blit", self._source_signature(image), w, h), self._blends(scaled))
 
     def text(self, text: str, x: float, y: float) -> None:
         font = self.font
         color = self._norm_color(self.brush)
         surf = font.render(str(text), True, color)
-        self._surface.blit(surf, (int(round(x)), int(round(y))))
+        rect = self._pixels().blit(surf, (int(round(x)), int(round(y))))
+        if _frame_cost is not None:
+            _frame_cost.text(str(text))
+        # Glyphs are antialiased onto what is underneath
+        self._record(rect, ("text", font, str(text), color), True)
 
     def measure_text(self, text: str) -> tuple:
         font = self.font
@@ -530,6 +1268,8 @@ class _SurfaceTarget:
         return surf.get_size()
 
     def window(self, x: float, y: float, width: float, height: float):
+        # Windows draw straight into the parent's surface, so it must be private
+        self._pixels()
         return _Window(self, x, y, width, height)
 
 
@@ -582,25 +1322,263 @@ class brushes:
 
     @staticmethod
     def xor(r, g=None, b=None, a=255) -> tuple:
-        # The real hardware performs a XOR blend; for the simulator,
-        # approximating with a solid colour keeps visuals readable.
-        return brushes.color(r, g, b, a)
+        # XORs the colour into whatever is underneath; drawn solid without NumPy
+        return _XorBrush(brushes.color(r, g, b, a))
+
+
+def _cache_dir(kind: str) -> str:
+    """Per-user simulator cache directory, kept outside the badge tree."""
+    import tempfile
+    path = os.path.join(tempfile.gettempdir(), "badge_simulator_cache", kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class _PPFFont:
+    """Pico pixel font (`.ppf`) decoded into a white glyph atlas.
+
+    Layout (big-endian): ``ppf!`` magic, u32 flags, u16 glyph count, u16 cell
+    width, u16 cell height, 32-byte name, then one (u32 codepoint, u16 advance)
+    entry per glyph followed by fixed-size 1bpp bitmaps, rows MSB first.
+    The decoded atlas is cached on disk keyed by the file's SHA-1, and in
+    memory so apps sharing a font decode it once per run.
+    """
+
+    MAGIC = b"ppf!"
+    HEADER = ">4sIHHH32s"
+    _loaded = {}
+
+    def __init__(self, name: str, width: int, height: int, codepoints, advances,
+                 mask: pygame.Surface):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.mask = mask
+        self.rects = {}
+        self.advances = {}
+        for index, (code, advance) in enumerate(zip(codepoints, advances)):
+            ch = chr(code)
+            # Space is stored with a zero advance; approximate the firmware's gap
+            if advance == 0 and ch == " ":
+                advance = max(1, width // 3)
+            self.rects[ch] = pygame.Rect(index * width, 0, width, height)
+            self.advances[ch] = advance
+
+    @classmethod
+    def load(cls, path: str) -> "_PPFFont":
+        import hashlib
+        with _real_open(path, "rb") as fh:
+            data = fh.read()
+        digest = hashlib.sha1(data).hexdigest()
+        font = cls._loaded.get(digest)
+        if font is None:
+            font = cls._from_cache(digest) or cls._decode(data, digest)
+            cls._loaded[digest] = font
+        return font
+
+    @classmethod
+    def _from_cache(cls, digest: str):
+        base = os.path.join(_cache_dir("fonts"), digest)
+        try:
+            with _real_open(base + ".json", "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            mask = pygame.image.load(base + ".png")
+        except (OSError, ValueError, pygame.error):
+            return None
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            mask = mask.convert_alpha()
+        return cls(meta["name"], meta["width"], meta["height"],
+                   meta["codepoints"], meta["advances"], mask)
+
+    @classmethod
+    def _decode(cls, data: bytes, digest: str) -> "_PPFFont":
+        import struct
+        header = struct.calcsize(cls.HEADER)
+        if len(data) < header or not data.startswith(cls.MAGIC):
+            raise ValueError("not a .ppf font")
+        _, _, count, width, height, raw_name = struct.unpack_from(cls.HEADER, data)
+        stride = (width + 7) // 8
+        glyph_bytes = stride * height
+        bitmaps = header + count * 6
+        if len(data) < bitmaps + count * glyph_bytes:
+            raise ValueError("truncated .ppf font")
+
+        entries = [struct.unpack_from(">IH", data, header + i * 6) for i in range(count)]
+        pixels = bytearray(count * width * height * 4)
+        row_pitch = count * width * 4
+        for index in range(count):
+            glyph = bitmaps + index * glyph_bytes
+            for row in range(height):
+                bits = int.from_bytes(data[glyph + row * stride:glyph + (row + 1) * stride], "big")
+                if not bits:
+                    continue
+                top = stride * 8 - 1
+                offset = row * row_pitch + index * width * 4
+                for col in range(width):
+                    if bits >> (top - col) & 1:
+                        pixels[offset + col * 4:offset + col * 4 + 4] = b"\xff\xff\xff\xff"
+        mask = pygame.image.frombuffer(bytes(pixels), (max(1, count * width), height), "RGBA").copy()
+
+        name = raw_name.split(b"\0", 1)[0].decode("latin-1")
+        codepoints = [code for code, _ in entries]
+        advances = [advance for _, advance in entries]
+        font = cls(name, width, height, codepoints, advances, mask)
+        cls._store(digest, font, codepoints, advances)
+        return font
+
+    @staticmethod
+    def _store(digest: str, font: "_PPFFont", codepoints, advances) -> None:
+        # Best effort: a read-only temp dir only costs a re-decode next run
+        try:
+            base = os.path.join(_cache_dir("fonts"), digest)
+            tmp = f"{base}.{os.getpid()}"
+            pygame.image.save(font.mask, tmp + ".png")
+            os.replace(tmp + ".png", base + ".png")
+            with _real_open(tmp + ".json", "w", encoding="utf-8") as fh:
+                json.dump({"name": font.name, "width": font.width, "height": font.height,
+                           "codepoints": codepoints, "advances": advances}, fh)
+            os.replace(tmp + ".json", base + ".json")
+        except (OSError, pygame.error):
+            pass
+
+    # pygame.font.Font-compatible surface used by PixelFont._Wrapper
+
+    def get_height(self) -> int:
+        return self.height
+
+    def metrics(self, text):
+        result = []
+        for ch in text:
+            advance = self.advances.get(ch)
+            result.append(None if advance is None else (0, advance, 0, self.height, advance))
+        return result
+
+    def size(self, text):
+        return (sum(self.advances.get(ch, 0) for ch in text), self.height)
+
+    def render(self, text, antialias=True, color=(255, 255, 255), background=None):
+        width = max(1, self.size(text)[0])
+        glyphs = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        pen = 0
+        for ch in text:
+            rect = self.rects.get(ch)
+            if rect is not None:
+                glyphs.blit(self.mask, (pen, 0), rect)
+            pen += self.advances.get(ch, 0)
+        glyphs.fill(tuple(color), special_flags=pygame.BLEND_RGBA_MULT)
+        if background is None:
+            return glyphs
+        surface = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        surface.fill(background)
+        surface.blit(glyphs, (0, 0))
+        return surface
 
 
 class PixelFont:
     class _Wrapper:
-        __slots__ = ("_font", "name", "height")
+        """Font handle returned by PixelFont.load.
+
+        Pixel fonts (.ppf) come with a white glyph atlas; each brush colour
+        gets a tinted copy of it, and strings are composed by blitting glyphs
+        from the atlas at their advances. Other fonts render whole strings
+        with pygame, which keeps their kerning. Either way, rendered strings
+        are kept in a small LRU, so labels redrawn every frame cost a single
+        blit.
+        """
+
+        __slots__ = ("_font", "name", "height", "_advances", "_mask", "_glyph_rects",
+                     "_atlases", "_strings")
+
+        MAX_ATLASES = 32
+        MAX_STRINGS = 256
 
         def __init__(self, font: pygame.font.Font, name: str):
             self._font = font
             self.name = name
             self.height = font.get_height()
+            self._advances = {}
+            self._mask = None          # white glyph atlas of a pixel font
+            self._glyph_rects = {}     # char -> Rect inside the atlas
+            self._atlases = OrderedDict()  # colour -> tinted atlas
+            self._strings = OrderedDict()  # (text, colour) -> composed surface
+
+        def _atlas(self, color) -> pygame.Surface:
+            atlas = self._atlases.get(color)
+            if atlas is not None:
+                self._atlases.move_to_end(color)
+                return atlas
+            if self._mask is None:
+                # Pixel fonts arrive with their atlas already decoded
+                self._mask = self._font.mask
+                self._glyph_rects = self._font.rects
+            atlas = self._mask.copy()
+            atlas.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+            self._atlases[color] = atlas
+            if len(self._atlases) > self.MAX_ATLASES:
+                self._atlases.popitem(last=False)
+            return atlas
+
+        def advance(self, ch: str) -> int:
+            """Horizontal advance of one glyph in pixels."""
+            advance = self._advances.get(ch)
+            if advance is None:
+                metrics = self._font.metrics(ch)
+                if metrics and metrics[0] is not None:
+                    advance = metrics[0][4]
+                else:
+                    advance = self._font.size(ch)[0]
+                self._advances[ch] = advance
+            return advance
+
+        def render(self, text, antialias=True, color=(255, 255, 255), background=None):
+            if not antialias or background is not None:
+                return self._font.render(text, antialias, color, background)
+            color = tuple(color)
+            key = (text, color)
+            surface = self._strings.get(key)
+            if surface is not None:
+                self._strings.move_to_end(key)
+                return surface
+            if isinstance(self._font, _PPFFont):
+                surface = self._compose(text, color)
+            else:
+                surface = self._font.render(text, True, color)
+            self._strings[key] = surface
+            if len(self._strings) > self.MAX_STRINGS:
+                self._strings.popitem(last=False)
+            return surface
+
+        def _compose(self, text, color) -> pygame.Surface:
+            atlas = self._atlas(color)
+            placements = []
+            pen = 0
+            right = 0
+            bottom = self.height
+            for ch in text:
+                rect = self._glyph_rects.get(ch)
+                if rect is None:
+                    glyph = self._font.render(ch, True, color)
+                    width, height = glyph.get_size()
+                else:
+                    glyph = None
+                    width, height = rect.size
+                placements.append((pen, glyph, rect))
+                right = max(right, pen + width)
+                bottom = max(bottom, height)
+                pen += self.advance(ch)
+
+            surface = pygame.Surface((max(1, right, pen), bottom), pygame.SRCALPHA)
+            for x, glyph, rect in placements:
+                if glyph is None:
+                    surface.blit(atlas, (x, 0), rect)
+                else:
+                    surface.blit(glyph, (x, 0))
+            return surface
 
-        def render(self, *args, **kwargs):
-            return self._font.render(*args, **kwargs)
-
-        def size(self, *args, **kwargs):
-            return self._font.size(*args, **kwargs)
+        def size(self, text):
+            if not isinstance(self._font, _PPFFont):
+                return self._font.size(str(text))
+            return (sum(self.advance(ch) for ch in str(text)), self.height)
 
         def get_height(self):
             return self._font.get_height()
@@ -610,6 +1588,8 @@ class PixelFont:
 
     @staticmethod
     def load(path: str, size: int = 14):
+        if _import_profiler is not None:
+            started = _import_profiler.clock()
         resolved = map_system_path(path)
         name = os.path.splitext(os.path.basename(path))[0]
         font = None
@@ -620,16 +1600,21 @@ class PixelFont:
                     font = pygame.font.Font(resolved, size)
                 except Exception:
                     font = None
-            else:
-                # Pico pixel fonts (`.ppf`) aren't true TTF files; using the
-                # default pygame font keeps the simulator stable.
-                font = None
+            elif ext == ".ppf":
+                try:
+                    font = _PPFFont.load(resolved)
+                except (OSError, ValueError) as exc:
+                    print(f"Warning: could not load pixel font {path}: {exc}")
+                    font = None
         if font is None:
             font = pygame.font.Font(None, size)
         
-        # Track font loading for performance monitoring
-        if _perf_monitor and _perf_monitor.enabled:
-            _perf_monitor.asset_tracker.register_font(resolved)
+        if _asset_tracker is not None:
+            _asset_tracker.register_font(resolved)
+        if _startup is not None:
+            _startup.decode(os.path.getsize(resolved) if os.path.isfile(resolved) else 0)
+        if _import_profiler is not None:
+            _import_profiler.asset("PixelFont.load", path, started)
         
         return PixelFont._Wrapper(font, name)
 
@@ -638,9 +1623,10 @@ class Image(_SurfaceTarget):
     OFF = 0
     X2 = 1
     X4 = 2
-    _cache = {}
+    _shared = False
+    _view = None    # (sheet, Rect) while a SpriteSheet frame still views the sheet's pixels
 
-    def __init__(self, *args, _surface: pygame.Surface = None):
+    def __init__(self, *args, _surface: pygame.Surface = None, _shared: bool = False):
         if _surface is None:
             if len(args) == 2:
                 width, height = args
@@ -651,6 +1637,9 @@ class Image(_SurfaceTarget):
             width = max(1, int(round(width)))
             height = max(1, int(round(height)))
             surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            if _asset_tracker is not None:
+                _asset_tracker.allocate(self, f"Image({width}x{height})",
+                                        AssetTracker.image_bytes(width, height, "rgba8888"))
         else:
             surface = _surface
             width = surface.get_width()
@@ -665,6 +1654,42 @@ class Image(_SurfaceTarget):
         self.y = 0
         if len(args) == 4:
             self.x, self.y = args[0], args[1]
+        # Set while _surface still belongs to the decode cache
+        self._shared = _shared
+
+    def _unshare(self) -> None:
+        if self._shared:
+            self._surface = self._surface.copy()
+            self._shared = False
+            self._view = None
+
+    def _source(self) -> pygame.Surface:
+        """Surface to read from, e.g. when blitted, with queued fills applied.
+
+        A sprite frame follows its sheet onto the sheet's private copy once
+        the sheet has been drawn to.
+        """
+        if self._fills:
+            return self._pixels()
+        if self._view is not None:
+            sheet, rect = self._view
+            surface = sheet._source()
+            if self._surface.get_parent() is not surface:
+                self._surface = surface.subsurface(rect)
+        return self._surface
+
+    def _pixels(self) -> pygame.Surface:
+        self._unshare()
+        return super()._pixels()
+
+    # Window ops and queued fills write too, so they also need a private copy
+    def _window_pixels(self, clip: pygame.Rect) -> pygame.Surface:
+        self._unshare()
+        return super()._window_pixels(clip)
+
+    def _flush_fills(self) -> None:
+        self._unshare()
+        super()._flush_fills()
 
     @property
     def alpha(self):
@@ -672,7 +1697,8 @@ class Image(_SurfaceTarget):
 
     @alpha.setter
     def alpha(self, value):
-        self._surface.set_alpha(None if value is None else int(value))
+        self._pixels().set_alpha(None if value is None else int(value))
+        self._version += 1
 
     def get_width(self):
         return self.width
@@ -680,24 +1706,50 @@ class Image(_SurfaceTarget):
     def get_height(self):
         return self.height
 
+    # Surface methods that only read pixels or metadata; forwarding them does
+    # not need to break the sharing with the decode cache
+    _SURFACE_READS = frozenset((
+        "copy", "get_abs_offset", "get_abs_parent", "get_alpha", "get_at", "get_at_mapped",
+        "get_bitsize", "get_bounding_rect", "get_bytesize", "get_clip",
+        "get_colorkey", "get_flags", "get_locked", "get_locks", "get_losses", "get_masks",
+        "get_offset", "get_palette", "get_palette_at", "get_parent", "get_pitch", "get_rect",
+        "get_shifts", "get_size", "map_rgb", "mustlock", "unmap_rgb",
+    ))
+
     def __getattr__(self, item):
-        return getattr(self._surface, item)
+        # _source() applies queued fills and follows a sprite's sheet
+        if self._shared and item in Image._SURFACE_READS:
+            return getattr(self._source(), item)
+        # Anything else may write, so it gets a private copy and counts as a
+        # change (the Screen's draw list compares blits by _version)
+        surface = self._pixels()
+        if item not in Image._SURFACE_READS:
+            self._version += 1
+        return getattr(surface, item)
 
     @staticmethod
     def load(path: str):
+        if _import_profiler is not None:
+            started = _import_profiler.clock()
         normalised = os.path.normpath(map_system_path(path))
-        if normalised in Image._cache:
-            source = Image._cache[normalised]
-        else:
-            source = pygame.image.load(normalised).convert_alpha()
-            Image._cache[normalised] = source
-            
-            # Track asset loading for performance monitoring
-            if _perf_monitor and _perf_monitor.enabled:
-                width, height = source.get_size()
-                _perf_monitor.asset_tracker.register_image(normalised, width, height)
-        
-        return Image(_surface=source.copy())
+        source, (pixel_format, palette_entries) = _image_cache.get(normalised)
+        image = Image(_surface=source, _shared=True)
+        image.has_palette = pixel_format == "p8"
+
+        # Cache hits count too: the badge decodes every Image.load() again
+        width, height = source.get_size()
+        if _asset_tracker is not None:
+            _asset_tracker.allocate(image, path, AssetTracker.image_bytes(
+                width, height, pixel_format, palette_entries))
+        if _startup is not None:
+            _startup.decode(AssetTracker.image_bytes(width, height, pixel_format, palette_entries),
+                            width * height)
+        if _frame_cost is not None:
+            _frame_cost.decode(width, height)
+        if _import_profiler is not None:
+            _import_profiler.asset("Image.load", path, started)
+
+        return image
 
 
 class SpriteSheet:
@@ -707,18 +1759,38 @@ class SpriteSheet:
         self.rows = rows
         self.frame_width = self.sheet.get_width() // cols
         self.frame_height = self.sheet.get_height() // rows
+        self._sprites = {}
 
     def sprite(self, x: int, y: int) -> Image:
+        """Frame (x, y) as a view into the sheet's pixels.
+
+        Each frame is built once and the same Image is returned afterwards, so
+        settings such as alpha stick between calls, as they do on the badge.
+        """
+        sprite = self._sprites.get((x, y))
+        if sprite is not None:
+            return sprite
         rect = pygame.Rect(
             x * self.frame_width,
             y * self.frame_height,
             self.frame_width,
             self.frame_height,
         )
-        image = pygame.Surface((self.frame_width, self.frame_height), pygame.SRCALPHA)
-        src = self.sheet._surface if isinstance(self.sheet, Image) else self.sheet
-        image.blit(src, (0, 0), rect)
-        return Image(_surface=image)
+        src = self.sheet._source() if isinstance(self.sheet, Image) else self.sheet
+        if src.get_rect().contains(rect):
+            # Shares the sheet's pixels; copy-on-write keeps the sheet intact
+            sprite = Image(_surface=src.subsurface(rect), _shared=True)
+            if isinstance(self.sheet, Image):
+                sprite._view = (self.sheet, rect)
+        else:
+            image = pygame.Surface((self.frame_width, self.frame_height), pygame.SRCALPHA)
+            image.blit(src, (0, 0), rect)
+            sprite = Image(_surface=image)
+            if _asset_tracker is not None:
+                _asset_tracker.allocate(sprite, f"sprite({x},{y})", AssetTracker.image_bytes(
+                    self.frame_width, self.frame_height, "rgba8888"))
+        self._sprites[(x, y)] = sprite
+        return sprite
 
     def animation(self, x: int = 0, y: int = 0, length: int = None):
         frames = []
@@ -806,19 +1878,29 @@ class Matrix:
 
 
 class Screen(_SurfaceTarget):
-    def __init__(self, width: int = 160, height: int = 120, scale: int = 4, screenshot_dir: str = None) -> None:
+    def __init__(self, width: int = 160, height: int = 120, scale: int = 4, screenshot_dir: str = None,
+                 headless: bool = False) -> None:
         self.width = width
         self.height = height
         self.scale = scale
         self.screenshot_dir = screenshot_dir
+        self.headless = headless
         self._screenshot_counter = 0
         # Add space below for keyboard hints (30 pixels)
+        # In headless mode the SDL dummy driver gives us an off-screen window;
+        # a display mode is still required for Surface.convert_alpha().
         self._window = pygame.display.set_mode((width * scale, height * scale + 30))
         pygame.display.set_caption("Badge Local Simulator")
         surface = pygame.Surface((width, height), pygame.SRCALPHA)
         super().__init__(surface)
         self.antialias = Image.OFF
         self._hint_font = pygame.font.Font(None, 16)
+        # Retained draw lists: this frame's ops and the ones last presented.
+        # None for _presented forces the next present() to redraw everything.
+        if not headless:
+            self._draw_list = []
+            self._hint_bar = self._render_hint_bar()
+        self._presented = None
     
     def set_icon(self, icon_path: str) -> None:
         """Set the application icon (displayed in dock/taskbar)."""
@@ -838,7 +1920,8 @@ class Screen(_SurfaceTarget):
         src = self._unwrap(image)
         if src.get_width() != self.width or src.get_height() != self.height:
             src = pygame.transform.scale(src, (self.width, self.height))
-        self._surface.blit(src, (0, 0))
+        rect = self._pixels().blit(src, (0, 0))
+        self._record(rect, ("blit", object()))
 
     def window(self, x: float, y: float, width: float, height: float):
         return _Window(self, x, y, width, height)
@@ -858,28 +1941,19 @@ class Screen(_SurfaceTarget):
         self._screenshot_counter += 1
         
         # Save the native resolution surface (not the scaled version)
-        pygame.image.save(self._surface, filepath)
+        pygame.image.save(self._pixels(), filepath)
         print(f"Screenshot saved: {filepath}")
 
-    def present(self) -> None:
-        # Scale and blit the game screen to a temporary surface
-        scaled_game = pygame.transform.scale(
-            self._surface, (self.width * self.scale, self.height * self.scale)
-        )
-        
-        # Blit the scaled game to the window
-        self._window.blit(scaled_game, (0, 0))
-        
-        # Draw keyboard hints below the screen
-        y_offset = self.height * self.scale
+    def invalidate(self) -> None:
+        """Redraw the whole window on the next present() (e.g. after an expose)."""
+        self._presented = None
+
+    def _render_hint_bar(self) -> pygame.Surface:
+        """Pre-render the keyboard hints shown below the screen."""
         hint_bg = (40, 40, 40)
         hint_text = (200, 200, 200)
-        
-        # Fill the hint area with dark background
-        hint_rect = pygame.Rect(0, y_offset, self.width * self.scale, 30)
-        pygame.draw.rect(self._window, hint_bg, hint_rect)
-        
-        # Draw the hint text
+        bar = pygame.Surface((self.width * self.scale, 30))
+        bar.fill(hint_bg)
         hints = [
             ("Z/A: A", 10),
             ("X/B: B", 100),
@@ -887,16 +1961,95 @@ class Screen(_SurfaceTarget):
             ("Arrows: D-pad", 300),
             ("H/Esc: Home", 450)
         ]
-        
         for hint, x_pos in hints:
             text_surf = self._hint_font.render(hint, True, hint_text)
-            self._window.blit(text_surf, (x_pos, y_offset + 8))
-        
-        pygame.display.flip()
+            bar.blit(text_surf, (x_pos, 8))
+        return bar
+
+    @staticmethod
+    def _dirty_rects(previous, current):
+        """Rects touched by ops that differ between two frames' draw lists.
+
+        Ops that match are peeled off the front and back of both lists; every
+        pixel outside the rects of the remaining ops was produced by the same
+        sequence of ops in both frames. That sequence only reproduces the same
+        pixels if it starts from the same ones, so ops that blend with the
+        destination carry a unique signature until the frame has covered the
+        whole surface (see _SurfaceTarget._record).
+        """
+        start = 0
+        limit = min(len(previous), len(current))
+        while start < limit and previous[start] == current[start]:
+            start += 1
+        end_prev = len(previous)
+        end_cur = len(current)
+        while end_prev > start and end_cur > start and previous[end_prev - 1] == current[end_cur - 1]:
+            end_prev -= 1
+            end_cur -= 1
+        return [rect for _, rect in previous[start:end_prev]] + [rect for _, rect in current[start:end_cur]]
+
+    def present(self) -> None:
+        self._pixels()  # apply queued fills
+        # Nothing is watching a headless window; the 160x120 framebuffer is
+        # still rendered and can be captured with take_screenshot().
+        if self.headless:
+            return
+
+        ops = self._draw_list
+        self._draw_list = []
+        self._covered = False
+        previous = self._presented
+        self._presented = ops
+
+        if previous is None:
+            # Scale the whole game screen and show it opaque; the badge
+            # display has no alpha channel
+            scaled_game = pygame.transform.scale(
+                self._surface, (self.width * self.scale, self.height * self.scale)
+            )
+            scaled_game.set_alpha(None)
+            self._window.blit(scaled_game, (0, 0))
+
+            # Keyboard hints below the screen
+            self._window.blit(self._hint_bar, (0, self.height * self.scale))
+            pygame.display.flip()
+            return
+
+        screen_rect = self._surface.get_rect()
+        dirty = [rect.clip(screen_rect) for rect in self._dirty_rects(previous, ops)]
+        dirty = [rect for rect in dirty if rect]
+        if not dirty:
+            return
+        # Many or overlapping large rects cost more to scale one by one
+        # than their bounding box does
+        if len(dirty) > 1:
+            area = sum(rect.width * rect.height for rect in dirty)
+            if len(dirty) > 16 or area * 2 > self.width * self.height:
+                dirty = [dirty[0].unionall(dirty[1:])]
+
+        scale = self.scale
+        updated = []
+        for rect in dirty:
+            scaled = pygame.transform.scale(
+                self._surface.subsurface(rect), (rect.width * scale, rect.height * scale)
+            )
+            scaled.set_alpha(None)
+            dest = pygame.Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+            self._window.blit(scaled, dest)
+            updated.append(dest)
+        pygame.display.update(updated)
 
 
 class _Window:
-    def __init__(self, parent: Screen, x: float, y: float, width: float, height: float):
+    """Clipped, offset view onto a parent target (see screen.window()).
+
+    The parent keeps track of the clip currently set on its surface, so
+    window ops do not save and restore it around every call. Nested windows
+    are clipped to the intersection with their enclosing window.
+    """
+
+    def __init__(self, parent: Screen, x: float, y: float, width: float, height: float,
+                 bounds: pygame.Rect = None):
         self._parent = parent
         self.x = int(round(x))
         self.y = int(round(y))
@@ -904,32 +2057,31 @@ class _Window:
         self.height = max(0, int(round(height)))
         self.brush = parent.brush
         self.font = parent.font
+        clip = pygame.Rect(self.x, self.y, self.width, self.height)
+        if bounds is not None:
+            clip = clip.clip(bounds)
+        self._clip = clip
+        # Identifies this window's placement in the parent's draw list
+        self._signature = (self.x, self.y, self.width, self.height, tuple(clip))
 
-    def _set_clip(self):
-        prev = self._parent._surface.get_clip()
-        rect = pygame.Rect(self.x, self.y, self.width, self.height)
-        self._parent._surface.set_clip(rect)
-        return prev
-
-    def _restore_clip(self, prev):
-        self._parent._surface.set_clip(prev)
+    def _surface(self) -> pygame.Surface:
+        return self._parent._window_pixels(self._clip)
 
     def clear(self, color=None):
-        clip = self._set_clip()
-        try:
-            fill_color = self._parent._norm_color(color if color is not None else self.brush)
-            rect = pygame.Rect(self.x, self.y, self.width, self.height)
-            self._parent._surface.fill(fill_color, rect)
-        finally:
-            self._restore_clip(clip)
+        surface = self._surface()
+        fill_color = self._parent._norm_color(color if color is not None else self.brush)
+        rect = surface.fill(fill_color, self._clip)
+        if _frame_cost is not None:
+            _frame_cost.fill(rect)
+        self._parent._record(rect, ("clear", fill_color))
 
     def draw(self, shape: _Shape) -> None:
         color = self._parent._norm_color(self.brush)
-        clip = self._set_clip()
-        try:
-            _render_shape(self._parent._surface, color, shape, offset=(self.x, self.y))
-        finally:
-            self._restore_clip(clip)
+        antialias = self._parent.antialias
+        rect = _draw_shape(self._surface(), color, shape, offset=(self.x, self.y), antialias=antialias)
+        if _frame_cost is not None and rect:
+            _frame_cost.shape(shape, rect, color, antialias)
+        self._parent._record_shape(rect, color, shape, self._signature)
 
     def _offset(self, x: float, y: float, transform: "Matrix" = None):
         if isinstance(transform, Matrix):
@@ -937,48 +2089,97 @@ class _Window:
         return x + self.x, y + self.y
 
     def blit(self, image, x: float, y: float, transform: "Matrix" = None) -> None:
-        clip = self._set_clip()
-        try:
-            x, y = self._offset(x, y, transform)
-            self._parent._surface.blit(
-                self._parent._unwrap(image),
-                (int(x), int(y)),
-            )
-        finally:
-            self._restore_clip(clip)
+        src = self._parent._unwrap(image)
+        x, y = self._offset(x, y, transform)
+        rect = self._surface().blit(src, (int(x), int(y)))
+        if _frame_cost is not None:
+            _frame_cost.blit(rect)
+        self._parent._record(rect, ("blit", self._parent._source_signature(image)), self._parent._blends(src))
 
     def scale_blit(self, image, x: float, y: float, w: int, h: int, transform: "Matrix" = None) -> None:
-        clip = self._set_clip()
-        try:
-            x, y = self._offset(x, y, transform)
-            src = self._parent._unwrap(image)
-            new_w = max(1, abs(w))
-            new_h = max(1, abs(h))
-            scaled = pygame.transform.scale(src, (new_w, new_h))
-            if w < 0:
-                scaled = pygame.transform.flip(scaled, True, False)
-            if h < 0:
-                scaled = pygame.transform.flip(scaled, False, True)
-            self._parent._surface.blit(scaled, (int(x), int(y)))
-        finally:
-            self._restore_clip(clip)
+        x, y = self._offset(x, y, transform)
+        src = self._parent._unwrap(image)
+        new_w = max(1, abs(w))
+        new_h = max(1, abs(h))
+        scaled = pygame.transform.scale(src, (new_w, new_h))
+        if w < 0:
+            scaled = pygame.transform.flip(scaled, True, False)
+        if h < 0:
+            scaled = pygame.transform.flip(scaled, False, True)
+        rect = self._surface().blit(scaled, (int(x), int(y)))
+        if _frame_cost is not None:
+            _frame_cost.blit(rect, scaled=True)
+        self._parent._record(rect, ("scale_blit", self._parent._source_signature(image), w, h),
+                             self._parent._blends(scaled))
 
     def text(self, text: str, x: float, y: float) -> None:
-        clip = self._set_clip()
-        try:
-            font = self.font or self._parent.font
-            surf = font.render(str(text), True, self._parent._norm_color(self.brush))
-            self._parent._surface.blit(surf, (int(x + self.x), int(y + self.y)))
-        finally:
-            self._restore_clip(clip)
+        font = self.font or self._parent.font
+        color = self._parent._norm_color(self.brush)
+        surf = font.render(str(text), True, color)
+        rect = self._surface().blit(surf, (int(x + self.x), int(y + self.y)))
+        if _frame_cost is not None:
+            _frame_cost.text(str(text))
+        self._parent._record(rect, ("text", font, str(text), color), True)
 
     def measure_text(self, text: str) -> tuple:
         font = self.font or self._parent.font
+        if hasattr(font, "size"):
+            return font.size(str(text))
         surf = font.render(str(text), True, (0, 0, 0))
         return surf.get_size()
 
     def window(self, x: float, y: float, width: float, height: float):
-        return _Window(self._parent, self.x + x, self.y + y, width, height)
+        return _Window(self._parent, self.x + x, self.y + y, width, height, self._clip)
+
+
+class InputTrace:
+    """Per-frame button input trace stored as JSON lines.
+
+    The first line is a header (``{"version": 1, "seed": ...}``); every
+    following line is one frame: ``[ticks_delta, [pressed...], [released...]]``.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, mode: str = "r", seed: int = None) -> None:
+        self.path = path
+        self.mode = mode
+        self.seed = seed
+        self.frames = []
+        self._index = 0
+        self._fh = None
+        if mode == "w":
+            self._fh = _real_open(path, "w", encoding="utf-8")
+            header = {"version": InputTrace.VERSION, "seed": seed}
+            self._fh.write(json.dumps(header) + "\n")
+        else:
+            with _real_open(path, "r", encoding="utf-8") as fh:
+                lines = [line for line in fh if line.strip()]
+            if lines:
+                header = json.loads(lines[0])
+                if not isinstance(header, dict) or header.get("version") != InputTrace.VERSION:
+                    raise ValueError(f"Unsupported input trace: {path}")
+                self.seed = header.get("seed")
+                for line in lines[1:]:
+                    delta, pressed, released = json.loads(line)
+                    self.frames.append((int(delta), pressed, released))
+
+    def record(self, ticks_delta: int, pressed: set, released: set) -> None:
+        entry = [int(ticks_delta), sorted(pressed), sorted(released)]
+        self._fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def next_frame(self):
+        """Return the next (ticks_delta, pressed, released) or None at the end."""
+        if self._index >= len(self.frames):
+            return None
+        frame = self.frames[self._index]
+        self._index += 1
+        return frame
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
 
 
 class IO:
@@ -991,7 +2192,7 @@ class IO:
     BUTTON_RIGHT = "BUTTON_RIGHT"
     BUTTON_HOME = "BUTTON_HOME"
 
-    def __init__(self) -> None:
+    def __init__(self, clock=None, recorder: InputTrace = None, replay: InputTrace = None) -> None:
         self.pressed: set = set()
         self.down: set = set()
         self.released: set = set()
@@ -999,7 +2200,13 @@ class IO:
         self.held: set = set()
         self.ticks = 0
         self.ticks_delta = 0
-        self._last_ticks = pygame.time.get_ticks()
+        # Optional FrameClock; when set, io.ticks follows virtual time
+        self._clock = clock
+        self._last_ticks = self._now()
+        # Optional input traces (--record / --replay)
+        self._recorder = recorder
+        self._replay = replay
+        self.replay_finished = False
         self._key_map = {
             pygame.K_a: IO.BUTTON_A,
             pygame.K_b: IO.BUTTON_B,
@@ -1015,6 +2222,11 @@ class IO:
             pygame.K_ESCAPE: IO.BUTTON_HOME,
         }
 
+    def _now(self) -> int:
+        if self._clock is not None:
+            return self._clock.get_ticks()
+        return pygame.time.get_ticks()
+
     def update(self) -> None:
         self.pressed.clear()
         self.released.clear()
@@ -1022,27 +2234,54 @@ class IO:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit(0)
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                screen.invalidate()
             if event.type == pygame.KEYDOWN:
                 # Handle screenshot key (F12)
                 if event.key == pygame.K_F12:
                     screen.take_screenshot()
-                elif event.key in self._key_map:
+                elif self._replay is None and event.key in self._key_map:
                     name = self._key_map[event.key]
                     self.pressed.add(name)
                     self.down.add(name)
             if event.type == pygame.KEYUP:
-                if event.key in self._key_map:
+                if self._replay is None and event.key in self._key_map:
                     name = self._key_map[event.key]
                     self.down.discard(name)
                     self.released.add(name)
+
+        if self._replay is not None:
+            self._update_from_replay()
+        else:
+            now = self._now()
+            self.ticks_delta = now - self._last_ticks
+            self.ticks = now
+            self._last_ticks = now
+
         self.held = set(self.down)
         self.changed = set()
         self.changed.update(self.pressed)
         self.changed.update(self.released)
-        now = pygame.time.get_ticks()
-        self.ticks_delta = now - self._last_ticks
-        self.ticks = now
-        self._last_ticks = now
+
+        if self._recorder is not None:
+            self._recorder.record(self.ticks_delta, self.pressed, self.released)
+
+    def _update_from_replay(self) -> None:
+        frame = self._replay.next_frame()
+        if frame is None:
+            self.replay_finished = True
+            self.ticks_delta = 0
+            return
+        delta, pressed, released = frame
+        for name in pressed:
+            self.pressed.add(name)
+            self.down.add(name)
+        for name in released:
+            self.down.discard(name)
+            self.released.add(name)
+        # Recorded deltas drive time so replays match the original run exactly
+        self.ticks_delta = delta
+        self.ticks += delta
 
 
 class Display:
@@ -1053,49 +2292,301 @@ class Display:
 display = Display()
 
 
-class State:
-    @staticmethod
-    def _state_dir() -> str:
-        root = SIM_ROOT or _find_sim_root(os.getcwd())
+class _StateWriter:
+    """Coalesce State.save() calls into few, atomic writes.
+
+    Apps save from hot paths (every quest hit, every high score), and on the
+    badge's flash each write is slow and wears it. The first save of a name
+    is written at once; later ones only mark it dirty, and dirty names are
+    flushed at most once per `interval_ms` of badge time and when the app
+    exits. Files are written to a temporary name and renamed over the old one,
+    so a crash never leaves half a file. `binary` selects a compact tagged
+    encoding (see _pack_state) instead of JSON; writing one encoding removes
+    the name's file in the other.
+
+    A deferred write that fails keeps its data pending; it is tried again
+    once the interval has passed and straight away on the name's next
+    save(), which raises (so State.save() returns False) only if that try
+    fails too. Whatever still cannot be written when the app exits is
+    reported by flush().
+    """
+
+    DEFAULT_INTERVAL_MS = 1000
+
+    def __init__(self, interval_ms: int = DEFAULT_INTERVAL_MS, binary: bool = False):
+        self.interval_ms = interval_ms
+        self.binary = binary
+        self.pending = {}           # name -> encoded data waiting for a write
+        self.errors = {}            # name -> OSError of its last failed write
+        self.reset()
+
+    def reset(self) -> None:
+        """Start the per-app counters over.
+
+        Write times are forgotten too: under --benchmark each app gets a new
+        io whose ticks restart from 0, so the next app's first save of a
+        name is written at once.
+        """
+        self._written_at = {}       # name -> io.ticks of its last write
+        self.saves = 0
+        self.writes = 0
+        self.failed = 0
+        self.bytes_written = 0
+
+    @property
+    def extension(self) -> str:
+        return ".bin" if self.binary else ".json"
+
+    def encode(self, data) -> bytes:
+        if self.binary:
+            return _STATE_MAGIC + _pack_state(data)
+        return json.dumps(data).encode("utf-8")
+
+    @staticmethod
+    def decode(raw: bytes):
+        if raw.startswith(_STATE_MAGIC):
+            value, _ = _unpack_state(raw, len(_STATE_MAGIC))
+            return value
+        return json.loads(raw.decode("utf-8"))
+
+    def save(self, name: str, data) -> None:
+        raw = self.encode(data)
+        self.saves += 1
+        self.pending[name] = raw
+        error = self.errors.pop(name, None)
+        last = self._written_at.get(name)
+        if error is not None or last is None or self._now() - last >= self.interval_ms:
+            self._write(name)
+            error = self.errors.pop(name, None)
+        if error is not None:
+            raise error
+
+    @property
+    def _other_extension(self) -> str:
+        return ".json" if self.binary else ".bin"
+
+    def load(self, name: str):
+        """Raw data for `name`, pending or on disk, or None.
+
+        If files exist in both encodings (left by runs with different
+        --state-format settings) the newer one wins.
+        """
+        raw = self.pending.get(name)
+        if raw is not None:
+            return raw
+        newest = None
+        for ext in (self.extension, self._other_extension):
+            path = State._state_path(name, ext)
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, path)
+        if newest is None:
+            return None
+        with _real_open(newest[1], "rb") as fh:
+            return fh.read()
+
+    def tick(self) -> None:
+        """Write the dirty names whose interval has passed; called once a frame."""
+        now = self._now()
+        for name in [name for name in self.pending
+                     if now - self._written_at.get(name, float("-inf")) >= self.interval_ms]:
+            self._write(name)
+
+    def flush(self) -> None:
+        """Write every pending name now (the app is exiting) and report the
+        ones that still fail; their data is dropped."""
+        for name in list(self.pending):
+            self._write(name)
+        for name, error in self.errors.items():
+            print(f"[State] Warning: could not save '{name}': {error}")
+            self.pending.pop(name, None)
+        self.errors.clear()
+
+    def _now(self) -> int:
+        return _io_ref.ticks if _io_ref is not None else 0
+
+    def _write(self, name: str) -> None:
+        raw = self.pending[name]
+        self._written_at[name] = self._now()
+        path = State._state_path(name, self.extension)
+        partial = path + ".tmp"
+        try:
+            with _real_open(partial, "wb") as fh:
+                fh.write(raw)
+            os.replace(partial, path)
+        except OSError as e:
+            # Stays pending: retried after the interval and on the next save()
+            self.errors[name] = e
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            self.failed += 1
+            return
+        del self.pending[name]
+        self.errors.pop(name, None)
+        try:
+            os.remove(State._state_path(name, self._other_extension))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[State] Warning: could not remove old state for '{name}': {e}")
+        self.writes += 1
+        self.bytes_written += len(raw)
+
+    def report(self, name: str) -> None:
+        if self.saves:
+            print(f"[State] {name}: {self.saves} save(s), {self.writes} write(s), "
+                  f"{max(0, self.saves - self.writes - self.failed)} avoided ({self.bytes_written / 1024:.1f}KB written)"
+                  + (f", {self.failed} failed" if self.failed else ""))
+
+
+# Compact binary State encoding: a tag byte per value; ints are zigzag
+# varints, floats little-endian doubles, strings, lists and dicts are
+# prefixed with a varint length. Tuples come back as lists, as with JSON.
+_STATE_MAGIC = b"BST\x01"
+
+
+def _pack_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _pack_state(value, out: bytearray = None) -> bytes:
+    import struct
+    if out is None:
+        out = bytearray()
+        _pack_state(value, out)
+        return bytes(out)
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i"
+        _pack_varint(value << 1 if value >= 0 else (-value << 1) - 1, out)
+    elif isinstance(value, float):
+        out += b"f" + struct.pack("<d", value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        out += b"s"
+        _pack_varint(len(encoded), out)
+        out += encoded
+    elif isinstance(value, (list, tuple)):
+        out += b"l"
+        _pack_varint(len(value), out)
+        for item in value:
+            _pack_state(item, out)
+    elif isinstance(value, dict):
+        out += b"d"
+        _pack_varint(len(value), out)
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"state keys must be strings, not {type(key).__name__}")
+            _pack_state(key, out)
+            _pack_state(item, out)
+    else:
+        raise TypeError(f"cannot save {type(value).__name__} in State")
+
+
+def _unpack_varint(raw: bytes, pos: int):
+    value = shift = 0
+    while True:
+        byte = raw[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _unpack_state(raw: bytes, pos: int = 0):
+    """Decode one value at `pos`; returns (value, position after it)."""
+    import struct
+    tag = raw[pos:pos + 1]
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag == b"T":
+        return True, pos
+    if tag == b"F":
+        return False, pos
+    if tag == b"i":
+        zigzag, pos = _unpack_varint(raw, pos)
+        return (zigzag >> 1) ^ -(zigzag & 1), pos
+    if tag == b"f":
+        return struct.unpack_from("<d", raw, pos)[0], pos + 8
+    if tag == b"s":
+        length, pos = _unpack_varint(raw, pos)
+        return raw[pos:pos + length].decode("utf-8"), pos + length
+    if tag == b"l":
+        count, pos = _unpack_varint(raw, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _unpack_state(raw, pos)
+            items.append(item)
+        return items, pos
+    if tag == b"d":
+        count, pos = _unpack_varint(raw, pos)
+        items = {}
+        for _ in range(count):
+            key, pos = _unpack_state(raw, pos)
+            items[key], pos = _unpack_state(raw, pos)
+        return items, pos
+    raise ValueError(f"bad state tag {tag!r} at byte {pos - 1}")
+
+
+class State:
+    """Named app state persisted under SIM_ROOT/.badge_state (see _StateWriter)."""
+
+    @staticmethod
+    def _state_dir() -> str:
+        root = SIM_ROOT or _find_sim_root(os.getcwd())
         path = os.path.join(root, ".badge_state")
         os.makedirs(path, exist_ok=True)
         return path
 
     @staticmethod
-    def _state_path(name: str) -> str:
+    def _state_path(name: str, ext: str = ".json") -> str:
         safe = "".join(ch for ch in name if ch.isalnum() or ch in ("-", "_"))
         if not safe:
             safe = "state"
-        return os.path.join(State._state_dir(), f"{safe}.json")
+        return os.path.join(State._state_dir(), f"{safe}{ext}")
 
     @staticmethod
     def load(name: str, target) -> bool:
-        path = State._state_path(name)
         try:
-            with open(path, "r", encoding="utf-8") as fh:
-                data = json.load(fh)
+            raw = _state_writer.load(name)
+            if raw is None:
+                return False
+            data = _state_writer.decode(raw)
             if isinstance(target, dict) and isinstance(data, dict):
                 target.update(data)
             return True
-        except FileNotFoundError:
-            return False
         except Exception:
             traceback.print_exc()
             return False
 
     @staticmethod
     def save(name: str, data) -> bool:
-        path = State._state_path(name)
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, "w", encoding="utf-8") as fh:
-                json.dump(data, fh)
+            _state_writer.save(name, data)
             return True
         except Exception:
             traceback.print_exc()
             return False
 
 
+_state_writer = _StateWriter()
+
+
 def clamp(value: float, minimum: float, maximum: float) -> float:
     if value < minimum:
         return minimum
@@ -1253,23 +2744,41 @@ class _MockNetwork:
 # Mock urllib.urequest for MicroPython compatibility
 # -----------------------------------------------------------------------------
 
-# Store reference to real urllib.request before we create mocks
+# Store references to the real urllib modules before we create mocks
+import urllib.error as _real_urllib_error
+import urllib.parse as _real_urllib_parse
 import urllib.request as _real_urllib_request
 
 class _MockUrequestResponse:
-    """Mock response object for urlopen that uses Python's urllib."""
+    """Mock response object for urlopen, streaming the body from a pooled connection."""
     
-    def __init__(self, real_response):
+    def __init__(self, real_response, finish=None):
         self._response = real_response
         self.status_code = real_response.status
+        self._finish = finish   # called once the body is read or the response closed
+        self.bytes_read = 0
+    
+    def _done(self, complete):
+        if self._finish is not None:
+            finish, self._finish = self._finish, None
+            finish(complete, self.bytes_read)
     
     def read(self, size=-1):
         """Read response data."""
-        return self._response.read(size)
+        try:
+            data = self._response.read(None if size is None or size < 0 else size)
+        except BaseException:
+            # A half-read response leaves its connection unusable
+            self._done(False)
+            raise
+        self.bytes_read += len(data)
+        if not data or self._response.isclosed():
+            self._done(True)
+        return data
     
     def readinto(self, buffer):
         """Read response data into a buffer (MicroPython style)."""
-        data = self._response.read(len(buffer))
+        data = self.read(len(buffer))
         if not data:
             return 0
         buffer[:len(data)] = data
@@ -1277,6 +2786,7 @@ class _MockUrequestResponse:
     
     def close(self):
         """Close the response."""
+        self._done(self._response.isclosed())
         self._response.close()
     
     def __enter__(self):
@@ -1286,21 +2796,257 @@ class _MockUrequestResponse:
         self.close()
 
 
+class _PooledConnection(http.client.HTTPConnection):
+    """HTTP(S) connection to an already resolved address, so DNS can be timed apart."""
+
+    def __init__(self, host, port, address, tls):
+        super().__init__(host, port)
+        self._address = address
+        self._tls = tls
+
+    def connect(self):
+        sock = socket.create_connection(self._address, self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self._tls:
+            import ssl
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self.sock = sock
+
+
+class _HTTPPool:
+    """HTTP/1.1 client behind the urlopen mock, keeping connections alive per host.
+
+    Apps such as stocks and crypto fetch one URL per symbol from the same
+    host in a row; reusing the connection saves a DNS lookup, a TCP connect
+    and a TLS handshake each time. Every request is timed in phases: DNS,
+    connect (including TLS), time to first byte and transfer of the body.
+    A connection goes back to the pool once its response has been read to
+    the end. `stand_in` sends every request to a local server instead,
+    keeping the original Host header (see _StandInServer). URLs that the
+    environment's proxy settings (HTTP_PROXY...) apply to go through urllib
+    as before, untimed.
+    """
+
+    MAX_IDLE_PER_HOST = 4
+    MAX_REDIRECTS = 5
+
+    def __init__(self):
+        self.stand_in = None        # (scheme, host, port) receiving every request
+        self.verbose = False        # print each request's timings
+        self._idle = {}             # (scheme, host, port) -> idle connections
+        self._proxies = None        # scheme -> proxy URL, read from the environment once
+        self.reset()
+
+    def reset(self) -> None:
+        """Start the per-app request log over."""
+        self.requests = []
+        self.connections = 0
+
+    def close(self) -> None:
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+    def _connect(self, key, timing):
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            # An idle socket that is readable has been closed by the server
+            # (or sent something unasked for); either way it is no use
+            if not select.select([connection.sock], [], [], 0)[0]:
+                timing["reused"] = True
+                return connection
+            connection.close()
+        import time
+        scheme, host, port = key
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        # Try each address in turn, as socket.create_connection would
+        error = None
+        for *_, address in addresses:
+            connection = _PooledConnection(host, port, address[:2], scheme == "https")
+            try:
+                connection.connect()
+                break
+            except OSError as e:
+                connection.close()
+                error = e
+        else:
+            raise error
+        timing["dns_ms"] = (resolved - started) * 1000.0
+        timing["connect_ms"] = (time.perf_counter() - resolved) * 1000.0
+        self.connections += 1
+        return connection
+
+    def _proxied(self, url) -> bool:
+        if self._proxies is None:
+            self._proxies = _real_urllib_request.getproxies()
+        if not self._proxies:
+            return False
+        parts = _real_urllib_parse.urlsplit(url)
+        return parts.scheme in self._proxies and not _real_urllib_request.proxy_bypass(parts.hostname or "")
+
+    def request(self, url, data=None, headers=None) -> _MockUrequestResponse:
+        """Send a GET (or a POST with `data`), following redirects like urllib."""
+        if self.stand_in is None and self._proxied(url):
+            request = _real_urllib_request.Request(url, data=data, headers=headers or {})
+            return _MockUrequestResponse(_real_urllib_request.urlopen(request))
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = self._send(url, data, headers)
+            location = response._response.getheader("Location")
+            if response.status_code not in (301, 302, 303, 307, 308) or not location:
+                break
+            response.read()
+            url = _real_urllib_parse.urljoin(url, location)
+            if data is not None and response.status_code in (301, 302, 303):
+                # Like urllib, the redirected request is a GET without the body
+                data = None
+                headers = {name: value for name, value in (headers or {}).items()
+                           if name.lower() not in ("content-length", "content-type")}
+        if response.status_code >= 400:
+            # urllib raised for error statuses, and apps rely on that
+            from io import BytesIO
+            body = response.read()
+            raise _real_urllib_error.HTTPError(url, response.status_code, response._response.reason,
+                                               response._response.headers, BytesIO(body))
+        return response
+
+    def _send(self, url, data, headers) -> _MockUrequestResponse:
+        import time
+        parts = _real_urllib_parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported protocol: {parts.scheme}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        headers = dict(headers or {})
+        key = (parts.scheme, parts.hostname, port)
+        if self.stand_in is not None:
+            headers.setdefault("Host", parts.netloc)
+            key = self.stand_in
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        method = "POST" if data is not None else "GET"
+        for attempt in range(2):
+            timing = {"method": method, "url": url, "dns_ms": 0.0, "connect_ms": 0.0, "reused": False}
+            connection = self._connect(key, timing)
+            sent = time.perf_counter()
+            sending = True
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                sending = False
+                response = connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                # Never pool a connection left in an unknown state
+                connection.close()
+                dropped = isinstance(e, (ConnectionError, http.client.BadStatusLine))
+                if not dropped or not timing["reused"] or attempt:
+                    raise
+                for stale in self._idle.pop(key, []):
+                    stale.close()
+                # The server dropped the idle connection. A POST that had
+                # been sent may have been acted on, so only a GET, or a POST
+                # that failed while sending, is sent again on a new one.
+                if not sending and data is not None:
+                    raise
+        received = time.perf_counter()
+        timing["status"] = response.status
+        timing["ttfb_ms"] = (received - sent) * 1000.0
+
+        def finish(complete, size):
+            timing["transfer_ms"] = (time.perf_counter() - received) * 1000.0
+            timing["bytes"] = size
+            self.requests.append(timing)
+            idle = self._idle.setdefault(key, [])
+            if complete and not response.will_close and len(idle) < self.MAX_IDLE_PER_HOST:
+                idle.append(connection)
+            else:
+                connection.close()
+            if self.verbose:
+                print(self._describe(timing))
+
+        return _MockUrequestResponse(response, finish)
+
+    @staticmethod
+    def _describe(timing) -> str:
+        setup = ("reused" if timing["reused"]
+                 else f"dns {timing['dns_ms']:.1f}ms connect {timing['connect_ms']:.1f}ms")
+        return (f"[HTTP] {timing['method']} {timing['url']} {timing['status']}: {setup}, "
+                f"ttfb {timing['ttfb_ms']:.1f}ms, transfer {timing['transfer_ms']:.1f}ms ({timing['bytes']} bytes)")
+
+    def summary(self) -> dict:
+        setup = sum(timing["dns_ms"] + timing["connect_ms"] for timing in self.requests)
+        total = setup + sum(timing["ttfb_ms"] + timing["transfer_ms"] for timing in self.requests)
+        return {
+            "requests": len(self.requests),
+            "connections": self.connections,
+            "setup_ms": round(setup, 1),
+            "total_ms": round(total, 1),
+        }
+
+    def report(self, name: str) -> None:
+        summary = self.summary()
+        if summary["requests"]:
+            print(f"[HTTP] {name}: {summary['requests']} request(s) over {summary['connections']} "
+                  f"new connection(s), {summary['setup_ms']:.0f}ms of {summary['total_ms']:.0f}ms "
+                  f"spent on DNS and connecting")
+
+
+class _StandInServer:
+    """Local HTTP/1.1 server standing in for the internet (--http-server DIR).
+
+    A GET or POST for https://HOST/PATH is answered with the file
+    DIR/HOST/PATH; query strings and request bodies are ignored. Responses carry a Content-Length, so the
+    pool keeps its connection alive like a real server would.
+    """
+
+    def __init__(self, directory: str):
+        import functools
+        import http.server
+        import threading
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out as separate writes; don't hold the body back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                # Answer with the file, as for GET; the request body is dropped
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.do_GET()
+
+            def translate_path(self, path):
+                host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+                return super().translate_path("/" + host + path)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(Handler, directory=os.path.abspath(directory)))
+        self.address = self.server.server_address[:2]
+        threading.Thread(target=self.server.serve_forever, name="badge-http", daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_http_pool = _HTTPPool()
+
+
 class _MockUrequest:
     """Mock urllib.urequest module for MicroPython compatibility."""
     
     @staticmethod
     def urlopen(url, data=None, headers=None):
         """Open a URL and return a response object."""
-        # Use the real urllib.request we saved earlier
-        if headers:
-            req = _real_urllib_request.Request(url, data=data, headers=headers)
-        else:
-            req = _real_urllib_request.Request(url, data=data)
-        
+        # Requests share keep-alive connections per host (see _HTTPPool)
         try:
-            response = _real_urllib_request.urlopen(req)
-            return _MockUrequestResponse(response)
+            return _http_pool.request(url, data=data, headers=headers)
         except Exception as e:
             print(f"[Simulator] HTTP Error: {e}")
             raise
@@ -1326,7 +3072,49 @@ def _cleanup_pycache():
     except Exception:
         pass
 
+class FrameClock:
+    """Deterministic replacement for pygame.time.Clock used in headless runs.
+
+    tick() advances a virtual clock by a fixed step instead of sleeping, so
+    frames run as fast as the host allows while io.ticks stays reproducible.
+    """
+
+    def __init__(self, step_ms: float = None) -> None:
+        self.step_ms = step_ms  # None -> 1000 / fps passed to tick()
+        self.frame = 0
+        self._ticks = 0.0
+        self._last_step = 0.0
+
+    def tick(self, fps: int = 0) -> int:
+        if self.step_ms is not None:
+            step = float(self.step_ms)
+        else:
+            step = 1000.0 / fps if fps else 0.0
+        self._ticks += step
+        self._last_step = step
+        self.frame += 1
+        return int(step)
+
+    def get_ticks(self) -> int:
+        return int(self._ticks)
+
+    def get_time(self) -> int:
+        return int(self._last_step)
+
+    def get_fps(self) -> float:
+        return 1000.0 / self._last_step if self._last_step else 0.0
+
+
+# Virtual clock shared by io and run() when --headless is active
+_frame_clock = None
+
+# Stop after this many frames in total (--frames); None runs forever
+_max_frames = None
+_frames_run = 0
+
+
 def run(update_func, fps: int = 60, init=None, on_exit=None):
+    global _frames_run
     if not callable(init):
         module_name = getattr(update_func, "__module__", None)
         module_obj = sys.modules.get(module_name) if module_name else None
@@ -1334,7 +3122,7 @@ def run(update_func, fps: int = 60, init=None, on_exit=None):
             init = getattr(module_obj, "init", None)
             if not callable(on_exit):
                 on_exit = getattr(module_obj, "on_exit", None)
-    clock = pygame.time.Clock()
+    clock = _frame_clock if _frame_clock is not None else pygame.time.Clock()
     result = None
     
     # Get performance monitor from global if available
@@ -1342,18 +3130,45 @@ def run(update_func, fps: int = 60, init=None, on_exit=None):
     
     try:
         if callable(init):
-            init()
+            if _startup is not None:
+                _startup.begin("init")
+            try:
+                init()
+            finally:
+                if _startup is not None:
+                    _startup.end()
         while True:
             io.update()
             
+            # Stop once a replayed input trace runs out
+            if io.replay_finished:
+                break
+            
             # Check for Home button press to return to menu
             if IO.BUTTON_HOME in io.pressed:
                 result = "__RETURN_TO_MENU__"
                 break
             
+            timing_start = _startup is not None and not _startup.started
+            if timing_start:
+                _startup.begin("first_frame")
+            if _profiler is not None:
+                _profiler.begin()
             result = update_func()
             screen.present()
+            if _profiler is not None:
+                _profiler.end()
             clock.tick(fps)
+            _frames_run += 1
+            if _heap_model is not None:
+                _heap_model.end_frame()
+            if _frame_cost is not None:
+                _frame_cost.end_frame()
+            if timing_start:
+                _startup.end()
+                _startup.report()
+            if _state_writer.pending:
+                _state_writer.tick()
             
             # Update performance metrics if enabled
             if perf_monitor:
@@ -1361,43 +3176,140 @@ def run(update_func, fps: int = 60, init=None, on_exit=None):
             
             if result is not None:
                 break
+            
+            if _max_frames is not None and _frames_run >= _max_frames:
+                break
     finally:
         if callable(on_exit):
             try:
                 on_exit()
             except Exception:
                 traceback.print_exc()
-        # Clean up __pycache__ directory
-        _cleanup_pycache()
+        _state_writer.flush()
+        # Clean up __pycache__ directory (warm loads never write one)
+        if not _warm:
+            _cleanup_pycache()
     return result
 
 # -----------------------------------------------------------------------------
 # Module loader
 # -----------------------------------------------------------------------------
 
-def load_game_module(module_path: str) -> ModuleType:
-    """Load a game module from a path or dotted module. Inject our `badgeware`."""
-    if module_path.endswith(".py"):
-        game_abs = os.path.abspath(map_system_path(module_path))
-        spec = importlib.util.spec_from_file_location("badge_game", game_abs)
-    else:
-        spec = importlib.util.find_spec(module_path)
-        if spec is None:
-            raise ImportError(f"Cannot find module {module_path}")
-        origin = getattr(spec, "origin", None)
-        game_abs = os.path.abspath(origin) if origin else os.getcwd()
-    if spec is None or spec.loader is None:
-        raise ImportError(f"Cannot load specification for {module_path}")
+# App modules are compiled through _code_cache into a bytecode cache outside
+# the badge tree. With --warm (app switching without rebuilds) the mock modules
+# are built once and compiled code stays in memory, so a switch only executes
+# the new app's modules.
+_warm = False
+_mock_modules = None
+
+
+class _CodeCache:
+    """Compiled app modules, on disk by source hash and in memory with --warm.
+
+    CPython's own .pyc files would land in the app tree, which
+    _cleanup_pycache keeps clean, so they were never reused.
+    """
+
+    def __init__(self):
+        self._codes = {}        # path -> ((mtime_ns, size), code), --warm only
+        self.hits = 0           # served from memory
+        self.misses = 0
+
+    def get(self, loader, path: str):
+        """Code object for `path`, and where it came from ("memory", "disk" or "compiled")."""
+        import hashlib
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if _warm:
+            entry = self._codes.get(path)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1], "memory"
+            self.misses += 1
+        data = loader.get_data(path)
+        # The path is part of the key because it is baked into the code object
+        digest = hashlib.sha1(importlib.util.MAGIC_NUMBER + os.fsencode(path) + data).hexdigest()
+        cached = os.path.join(_cache_dir("bytecode"), digest + ".pyc")
+        try:
+            with _real_open(cached, "rb") as fh:
+                code = marshal.load(fh)
+            source = "disk"
+        except (OSError, EOFError, ValueError, TypeError):
+            code = loader.source_to_code(data, path)
+            source = "compiled"
+            try:
+                partial = f"{cached}.{os.getpid()}"
+                with _real_open(partial, "wb") as fh:
+                    marshal.dump(code, fh)
+                os.replace(partial, cached)
+            except OSError:
+                pass
+        if _warm:
+            self._codes[path] = (key, code)
+        return code, source
+
+
+_code_cache = _CodeCache()
+
+
+class _CachedSourceLoader(importlib.machinery.SourceFileLoader):
+    """Source loader that compiles through _code_cache and never writes .pyc files."""
+
+    def get_code(self, fullname):
+        path = self.get_filename(fullname)
+        if _import_profiler is None:
+            return _code_cache.get(self, path)[0]
+        started = _import_profiler.clock()
+        code, source = _code_cache.get(self, path)
+        _import_profiler.code(source, started)
+        return code
+
+    def exec_module(self, module):
+        if _import_profiler is None:
+            return super().exec_module(module)
+        _import_profiler.begin(module.__name__, self.path)
+        try:
+            super().exec_module(module)
+        finally:
+            _import_profiler.end()
 
-    # Make local imports work (e.g. `from mona import Mona`)
-    game_dir = os.path.dirname(game_abs)
-    sim_root = SIM_ROOT if SIM_ROOT is not None else _find_sim_root(game_dir)
-    simulator_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Add paths only if not already present to avoid accumulation
-    for p in (game_dir, os.path.join(sim_root, "apps"), simulator_dir):
-        if p not in sys.path:
-            sys.path.insert(0, p)
+
+class _AppFinder:
+    """Meta path finder handing modules under SIM_ROOT to _CachedSourceLoader.
+
+    Only search path entries under SIM_ROOT are looked at, so the standard
+    library and site-packages imports fall straight through to the usual
+    finders.
+    """
+
+    _inside = {}    # (SIM_ROOT, search path entry) -> entry is under SIM_ROOT?
+
+    @classmethod
+    def find_spec(cls, name, path=None, target=None):
+        if SIM_ROOT is None:
+            return None
+        inside = cls._inside
+        entries = []
+        for entry in sys.path if path is None else path:
+            key = (SIM_ROOT, entry)
+            under = inside.get(key)
+            if under is None:
+                under = inside[key] = (isinstance(entry, str) and
+                                       os.path.abspath(entry).startswith(os.path.join(SIM_ROOT, "")))
+            if under:
+                entries.append(entry)
+        if not entries:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(name, entries, target)
+        if spec is None or not isinstance(spec.loader, importlib.machinery.SourceFileLoader):
+            return None
+        spec.loader = _CachedSourceLoader(spec.name, spec.origin)
+        return spec
+
+
+def _build_mock_modules() -> dict:
+    """Build the stand-ins for badge firmware modules, keyed by module name."""
+    modules = {}
 
     # Provide `badgeware`
     badgeware = ModuleType("badgeware")
@@ -1417,18 +3329,14 @@ def load_game_module(module_path: str) -> ModuleType:
     badgeware.display = display
     badgeware.State = State
     badgeware.clamp = clamp
-    sys.modules["badgeware"] = badgeware
-    
-    # Set global reference for mock network timing
-    global _io_ref
-    _io_ref = io
+    modules["badgeware"] = badgeware
     
     # Provide mock `network` module for WiFi apps
     network_module = ModuleType("network")
     network_module.WLAN = _MockNetwork.WLAN
     network_module.STA_IF = _MockNetwork.STA_IF
     network_module.AP_IF = _MockNetwork.AP_IF
-    sys.modules["network"] = network_module
+    modules["network"] = network_module
     
     # Provide mock `urllib` with `urequest` submodule for MicroPython compatibility
     # Create the main urllib module
@@ -1442,11 +3350,11 @@ def load_game_module(module_path: str) -> ModuleType:
     urllib_module.urequest = urequest_module
     
     # Register both modules
-    sys.modules["urllib"] = urllib_module
-    sys.modules["urllib.urequest"] = urequest_module
+    modules["urllib"] = urllib_module
+    modules["urllib.urequest"] = urequest_module
     
     # Also provide a top-level urequest for direct imports
-    sys.modules["urequest"] = urequest_module
+    modules["urequest"] = urequest_module
     
     # Provide mock `urandom` module for MicroPython compatibility
     # Uses Python's standard random module
@@ -1483,7 +3391,7 @@ def load_game_module(module_path: str) -> ModuleType:
     urandom_module.choice = _urandom_choice
     urandom_module.random = _urandom_random
     urandom_module.uniform = _urandom_uniform
-    sys.modules["urandom"] = urandom_module
+    modules["urandom"] = urandom_module
     
     # Provide mock `aye_arr` module for IR receiver/transmitter functionality
     # This is hardware-specific and won't work in the simulator, but we can mock it
@@ -1553,7 +3461,10 @@ def load_game_module(module_path: str) -> ModuleType:
             keys = pygame.key.get_pressed()
             
             # Rate limit simulation to once per second
-            current_time = pygame.time.get_ticks()
+            if _io_ref is not None:
+                current_time = _io_ref.ticks
+            else:
+                current_time = pygame.time.get_ticks()
             if current_time - self._last_simulate_time < 1000:
                 return
             
@@ -1588,70 +3499,982 @@ def load_game_module(module_path: str) -> ModuleType:
     aye_arr_module.nec = aye_arr_nec_module
     
     # Register all modules
-    sys.modules["aye_arr"] = aye_arr_module
-    sys.modules["aye_arr.nec"] = aye_arr_nec_module
-    sys.modules["aye_arr.nec.remotes"] = aye_arr_nec_remotes_module
-    sys.modules["aye_arr.nec.remotes.descriptor"] = aye_arr_nec_remotes_descriptor_module
+    modules["aye_arr"] = aye_arr_module
+    modules["aye_arr.nec"] = aye_arr_nec_module
+    modules["aye_arr.nec.remotes"] = aye_arr_nec_remotes_module
+    modules["aye_arr.nec.remotes.descriptor"] = aye_arr_nec_remotes_descriptor_module
+    return modules
+
 
+def load_game_module(module_path: str) -> ModuleType:
+    """Load a game module from a path or dotted module. Inject our `badgeware`."""
+    if module_path.endswith(".py"):
+        game_abs = os.path.abspath(map_system_path(module_path))
+        spec = importlib.util.spec_from_file_location(
+            "badge_game", game_abs, loader=_CachedSourceLoader("badge_game", game_abs))
+    else:
+        spec = importlib.util.find_spec(module_path)
+        if spec is None:
+            raise ImportError(f"Cannot find module {module_path}")
+        origin = getattr(spec, "origin", None)
+        game_abs = os.path.abspath(origin) if origin else os.getcwd()
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load specification for {module_path}")
+
+    if _import_profiler is not None:
+        _import_profiler.reset()
+
+    # Make local imports work (e.g. `from mona import Mona`)
+    game_dir = os.path.dirname(game_abs)
+    sim_root = SIM_ROOT if SIM_ROOT is not None else _find_sim_root(game_dir)
+    simulator_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    # Add paths only if not already present to avoid accumulation
+    for p in (game_dir, os.path.join(sim_root, "apps"), simulator_dir):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+
+    # Provide `badgeware` and the other firmware modules; --warm builds them once
+    global _mock_modules
+    modules = _mock_modules if _mock_modules is not None else _build_mock_modules()
+    if _warm:
+        _mock_modules = modules
+    modules["badgeware"].screen = screen
+    modules["badgeware"].io = io
+    sys.modules.update(modules)
+    
+    # Set global reference for mock network timing
+    global _io_ref
+    _io_ref = io
+    
+    # App imports of `gc` get one whose collections are charged to the modelled badge heap
+    if _heap_model is not None:
+        _heap_model.start(sim_root)
+    
     mod = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(mod)  # type: ignore
     return mod
 
+
+def _unload_app(game_dir: str) -> None:
+    """Forget everything the previous app imported so the next one loads clean."""
+    # Clean up sys.path entries added by the previous app
+    if game_dir:
+        game_dir_abs = os.path.abspath(game_dir)
+        paths_to_remove = [p for p in sys.path if os.path.abspath(p).startswith(game_dir_abs)]
+        for p in paths_to_remove:
+            while p in sys.path:
+                sys.path.remove(p)
+
+    # Clean up module cache for clean reload
+    # Remove all modules that were loaded from the previous app
+    modules_to_remove = []
+    for mod_name, mod in sys.modules.items():
+        if mod and hasattr(mod, "__file__") and mod.__file__:
+            mod_file = os.path.abspath(mod.__file__)
+            if game_dir and mod_file.startswith(game_dir):
+                modules_to_remove.append(mod_name)
+
+    for mod_name in modules_to_remove:
+        del sys.modules[mod_name]
+
+    # Also remove the main module loaded as "badge_game"
+    if "badge_game" in sys.modules:
+        del sys.modules["badge_game"]
+
+    # Also remove common app modules that can conflict (like ui, icon)
+    # These will be re-imported fresh when the next app loads
+    for common_mod in ["ui", "icon", "beacon", "mona"]:
+        if common_mod in sys.modules:
+            del sys.modules[common_mod]
+
+    # The badge resets between apps, so one app's antialias setting (and its
+    # cost) must not carry over into the next
+    screen.antialias = 0
+
+    # Decoded images stay in _image_cache across switches; only the badge
+    # memory estimate starts over, as the old app's images are freed on device.
+    _end_app_reports(os.path.basename(os.path.normpath(game_dir)) if game_dir else "app")
+    # The badge drops its sockets with the app; the next one connects afresh
+    _http_pool.close()
+
+    # Force garbage collection to free memory; warm switches leave the old
+    # app's cycles to CPython's own collector rather than pause for a full pass
+    if not _warm:
+        collected = gc.collect()
+        if collected > 0:
+            print(f"[Simulator] Garbage collected {collected} objects")
+
+
+def _end_app_reports(name: str) -> None:
+    """Print an app's end-of-run reports, then start over for the next app.
+
+    Pending State writes are flushed first and always reported, failures
+    included; badge memory and heap need --perf, the sampled profile
+    --profile and network totals --http-timing.
+    """
+    _state_writer.flush()
+    _state_writer.report(name)
+    _state_writer.reset()
+    if _http_pool.verbose:
+        _http_pool.report(name)
+    _http_pool.reset()
+    if _asset_tracker is not None:
+        if _perf_monitor and _perf_monitor.enabled:
+            print(f"\n[Perf] {name}: badge assets peaked at {_asset_tracker.get_peak_kb():.1f}KB, "
+                  f"{_asset_tracker.get_total_kb():.1f}KB at exit")
+        _asset_tracker.reset(name)
+    if _heap_model is not None:
+        if _perf_monitor and _perf_monitor.enabled:
+            _heap_model.report(name)
+        _heap_model.reset()
+    if _profiler is not None:
+        _profiler.end_app(name)
+
 # -----------------------------------------------------------------------------
 # Performance monitoring
 # -----------------------------------------------------------------------------
 
 class AssetTracker:
-    """Track loaded assets to estimate MicroPython memory usage on the badge."""
-    
-    def __init__(self):
-        self.images = {}  # path -> (width, height, bytes)
-        self.fonts = set()
-        self.peak_images = 0
-        
-    def register_image(self, path, width, height):
-        """Register an image and estimate its memory footprint."""
-        if path not in self.images:
-            # MicroPython images: 2 bytes per pixel (RGB565) is typical
-            # Full RGBA would be 4 bytes/pixel, paletted can be 1-2 bytes
-            # Use 2 bytes as a reasonable average
-            estimated_bytes = width * height * 2
-            self.images[path] = (width, height, estimated_bytes)
-            if len(self.images) > self.peak_images:
-                self.peak_images = len(self.images)
-    
-    def unregister_image(self, path):
-        """Remove an image from tracking (when unloaded)."""
-        if path in self.images:
-            del self.images[path]
-    
+    """Track live images and fonts to estimate MicroPython memory usage on the badge.
+
+    Every Image is charged when it is created: Image.load() results (sprite
+    sheets included) at their pixel format on the badge, and Image(w, h)
+    canvases as RGBA8888. The charge is released when the Image is garbage
+    collected. Sprites are views into their sheet and cost nothing extra.
+    Fonts are charged at their file size.
+    """
+
+    # Badge has 512KB SRAM total, but realistically apps have ~300-400KB available
+    # (system uses some for badgeware, drivers, etc.)
+    BUDGET_KB = 400
+
+    # Bytes per pixel of each badge pixel format (see _png_format)
+    BYTES_PER_PIXEL = {"p8": 1, "rgb565": 2, "rgba8888": 4}
+    PALETTE_ENTRY_BYTES = 4
+    # Built-in font used when an app's font cannot be loaded
+    DEFAULT_FONT_BYTES = 20 * 1024
+
+    _tokens = itertools.count()
+
+    def __init__(self, strict=False):
+        self.strict = strict    # Raise MemoryError over BUDGET_KB, as the badge would
+        self.images = {}        # token -> (label, bytes) of every live image
+        self.fonts = {}         # path -> bytes
+        self.current_bytes = 0
+        self.peak_bytes = 0
+        self.apps = {}          # app name -> {"peak_kb": ..., "exit_kb": ...}
+
+    @classmethod
+    def image_bytes(cls, width, height, pixel_format, palette_entries=0):
+        """Badge bytes of a width x height image in `pixel_format`."""
+        return (width * height * cls.BYTES_PER_PIXEL[pixel_format]
+                + palette_entries * cls.PALETTE_ENTRY_BYTES)
+
+    def allocate(self, image, label, size):
+        """Charge `size` bytes for `image` until it is garbage collected."""
+        token = next(self._tokens)
+        self.images[token] = (label, size)
+        weakref.finalize(image, self.release, token)
+        self._grow(size, label)
+
+    def release(self, token):
+        """Free an allocation; ignored once reset() has started a new app."""
+        entry = self.images.pop(token, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
     def register_font(self, path):
         """Track a loaded font."""
-        self.fonts.add(path)
-    
+        if path in self.fonts:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = self.DEFAULT_FONT_BYTES
+        self.fonts[path] = size
+        self._grow(size, path)
+
+    def _grow(self, size, label):
+        self.current_bytes += size
+        if self.current_bytes > self.peak_bytes:
+            self.peak_bytes = self.current_bytes
+        if self.strict and self.current_bytes > self.BUDGET_KB * 1024:
+            raise MemoryError(f"{label}: badge assets would take {self.current_bytes / 1024:.1f}KB, "
+                              f"over the {self.BUDGET_KB}KB budget")
+
     def get_total_kb(self):
-        """Get total estimated memory for all tracked assets."""
-        total_bytes = sum(img[2] for img in self.images.values())
-        # Fonts are typically 10-50KB each, use 20KB average
-        total_bytes += len(self.fonts) * 20 * 1024
-        return total_bytes / 1024
-    
+        """Get total estimated memory for all live assets."""
+        return self.current_bytes / 1024
+
+    def get_peak_kb(self):
+        """Highest total since the app started."""
+        return self.peak_bytes / 1024
+
+    def get_decode_cache_stats(self):
+        """Hit rate (%) and resident KB of the simulator's image decode cache.
+
+        Unlike the badge estimate this is host memory, and it survives resets.
+        """
+        return _image_cache.hit_rate(), _image_cache.resident_bytes / 1024
+
     def get_largest_image_kb(self):
-        """Get size of the largest loaded image."""
+        """Get size of the largest live image."""
         if not self.images:
             return 0
-        return max(img[2] for img in self.images.values()) / 1024
-    
-    def reset(self):
-        """Clear all tracked assets."""
+        return max(size for _, size in self.images.values()) / 1024
+
+    def summary(self):
+        return {"peak_kb": round(self.get_peak_kb(), 1), "exit_kb": round(self.get_total_kb(), 1)}
+
+    def reset(self, app=None):
+        """Start over for the next app, keeping `app`'s peak and exit totals."""
+        if app is not None:
+            self.apps[app] = self.summary()
         self.images.clear()
         self.fonts.clear()
+        self.current_bytes = 0
+        self.peak_bytes = 0
+
+
+_asset_tracker = None
+
+
+class FrameCostEstimator:
+    """Estimate each frame's time on the badge from the drawing it does.
+
+    The host is far faster than the badge's 200MHz RP2350, so its frame rate
+    says little. Instead every shape, fill, blit, glyph and image decode is
+    counted and priced with a table of device costs in microseconds. The
+    defaults are rough starting points; calibrate them against hardware
+    with --device-costs.
+    """
+
+    FRAME_BUDGET_MS = 1000.0 / 60
+
+    DEFAULT_COSTS = {
+        "frame": 1500.0,            # io.update(), run loop and display update
+        "shape": 15.0,              # per shape: setup and edge list
+        "vertex": 1.0,              # per outline vertex
+        "shape_pixel": 0.03,        # per pixel of a shape's bounding box
+        "fill_pixel": 0.01,         # per pixel of clear() and opaque axis-aligned rectangles
+        "blit": 10.0,               # per blit or scale_blit
+        "blit_pixel": 0.04,         # per destination pixel of a blit
+        "scale_blit_pixel": 0.08,   # per destination pixel of a scale_blit
+        "glyph": 8.0,               # per character of text
+        "decode_pixel": 0.5,        # per pixel decoded by Image.load()
+        "blend": 2.0,               # pixel cost factor for translucent and XOR brushes
+        "aa_x2": 4.0,               # pixel cost factor for Image.X2
+        "aa_x4": 16.0,              # pixel cost factor for Image.X4
+    }
+
+    # Device raster cost of an antialiased shape relative to an aliased one:
+    # X2 and X4 take 4 and 16 coverage samples per pixel
+    AA_COST_KEYS = {Image.X2: "aa_x2", Image.X4: "aa_x4"}
+
+    COUNTERS = ("shapes", "vertices", "shape_pixels", "fill_pixels", "blits", "blit_pixels",
+                "scale_blit_pixels", "glyphs", "decodes", "decode_pixels", "gc_us")
+
+    _type_names = {}
+
+    def __init__(self, costs=None):
+        self.costs = dict(self.DEFAULT_COSTS)
+        if costs:
+            unknown = sorted(set(costs) - set(self.DEFAULT_COSTS))
+            if unknown:
+                raise ValueError(f"unknown device cost(s): {', '.join(unknown)}")
+            self.costs.update((key, float(value)) for key, value in costs.items())
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self.shape_types = {}   # e.g. "circle" or "circle.stroke" -> shapes drawn
+        self.weighted_pixels = 0.0  # shape pixels scaled by blend/antialias factors
+        self.aa_cost = 0.0      # shapes since the last take(), weighted by antialias factor
+        self.frame_ms = []      # estimated badge time of every finished frame
+        self._reported = 0      # frame_ms entries already summarised by take()
+        self._reported_shapes = 0
+
+    @classmethod
+    def load(cls, path: str) -> "FrameCostEstimator":
+        """Estimator with costs overridden from a JSON object in `path`."""
+        with _real_open(path, "r", encoding="utf-8") as fh:
+            costs = json.load(fh)
+        if not isinstance(costs, dict):
+            raise ValueError("expected a JSON object of cost names to microseconds")
+        return cls(costs)
+
+    @classmethod
+    def _type_name(cls, shape_type) -> str:
+        name = cls._type_names.get(shape_type)
+        if name is None:
+            # _RoundedRectangle -> rounded_rectangle
+            name = "".join("_" + ch.lower() if ch.isupper() else ch
+                           for ch in shape_type.__name__.lstrip("_")).lstrip("_")
+            cls._type_names[shape_type] = name
+        return name
+
+    @staticmethod
+    def _vertices(shape) -> int:
+        """Outline vertex count from the shape's parameters, without tessellating."""
+        if isinstance(shape, _Line):
+            return 2
+        if isinstance(shape, _RoundedRectangle):
+            limit = min(shape.w, shape.h) / 2.0
+            return sum(max(4, int(min(r, limit) * 2)) + 1 if r > 0 else 1 for r in shape.radii)
+        if isinstance(shape, _Rectangle):
+            return 4
+        if isinstance(shape, (_Circle, _Squircle)):
+            return shape.segments
+        if isinstance(shape, _RegularPolygon):
+            return shape.sides
+        if isinstance(shape, _Arc):
+            end = shape.end_deg + 360.0 if shape.end_deg < shape.start_deg else shape.end_deg
+            span = max(0.0, end - shape.start_deg)
+            return max(8, int(shape.radius * max(1.0, span / 45.0))) + 1
+        return len(shape.points())
+
+    def shape(self, shape, rect, color, antialias=0) -> None:
+        """Count a drawn shape; `rect` is the area it touched, or None.
+
+        Callers skip shapes culled by _coarse_bounds: the badge drops them
+        before rasterizing too.
+        """
+        base = shape.shape if isinstance(shape, _StrokedShape) else shape
+        name = self._type_name(type(base))
+        if base is not shape:
+            name += ".stroke"
+        self.shape_types[name] = self.shape_types.get(name, 0) + 1
+        counts = self.counts
+        counts["shapes"] += 1
+        counts["vertices"] += self._vertices(base)
+        aa_factor = self.costs[self.AA_COST_KEYS[antialias]] if antialias in self.AA_COST_KEYS else 1.0
+        self.aa_cost += aa_factor
+        if not rect:
+            return
+        pixels = rect[2] * rect[3]
+        counts["shape_pixels"] += pixels
+        factor = aa_factor
+        if isinstance(color, _XorBrush) or (len(color) == 4 and color[3] != 255):
+            factor *= self.costs["blend"]
+        self.weighted_pixels += pixels * factor
+
+    def fill(self, rect) -> None:
+        if rect:
+            self.counts["fill_pixels"] += rect[2] * rect[3]
+
+    def blit(self, rect, scaled=False) -> None:
+        self.counts["blits"] += 1
+        if rect:
+            self.counts["scale_blit_pixels" if scaled else "blit_pixels"] += rect[2] * rect[3]
+
+    def text(self, text: str) -> None:
+        self.counts["glyphs"] += len(text)
+
+    def decode(self, width: int, height: int) -> None:
+        self.counts["decodes"] += 1
+        self.counts["decode_pixels"] += width * height
+
+    def pause(self, us: float) -> None:
+        """Charge a modelled GC pause (see HeapModel) to the current frame."""
+        self.counts["gc_us"] += us
+
+    def end_frame(self) -> float:
+        """Close the current frame; returns its estimated badge time in ms."""
+        costs = self.costs
+        counts = self.counts
+        us = (costs["frame"]
+              + counts["shapes"] * costs["shape"]
+              + counts["vertices"] * costs["vertex"]
+              + self.weighted_pixels * costs["shape_pixel"]
+              + counts["fill_pixels"] * costs["fill_pixel"]
+              + counts["blits"] * costs["blit"]
+              + counts["blit_pixels"] * costs["blit_pixel"]
+              + counts["scale_blit_pixels"] * costs["scale_blit_pixel"]
+              + counts["glyphs"] * costs["glyph"]
+              + counts["decode_pixels"] * costs["decode_pixel"]
+              + counts["gc_us"])
+        ms = us / 1000.0
+        self.frame_ms.append(ms)
+        totals = self.totals
+        for key, value in counts.items():
+            totals[key] += value
+            counts[key] = 0
+        self.weighted_pixels = 0.0
+        return ms
+
+    def take(self):
+        """Mean and worst estimated ms, shapes per frame and their mean
+        antialias cost factor, since the last take()."""
+        recent = self.frame_ms[self._reported:]
+        shapes = self.totals["shapes"] - self._reported_shapes
+        aa_factor = self.aa_cost / shapes if shapes else 1.0
+        self._reported = len(self.frame_ms)
+        self._reported_shapes = self.totals["shapes"]
+        self.aa_cost = 0.0
+        if not recent:
+            return 0.0, 0.0, 0.0, 1.0
+        return sum(recent) / len(recent), max(recent), shapes / len(recent), aa_factor
+
+    def summary(self) -> dict:
+        """Estimated frame times plus per-frame operation counts for a report."""
+        frames = max(1, len(self.frame_ms))
+        return {
+            "frame_ms": _timing_summary(self.frame_ms),
+            "slow_frames": sum(1 for ms in self.frame_ms if ms > self.FRAME_BUDGET_MS),
+            "per_frame": {key: round(value / frames, 1) for key, value in self.totals.items()},
+            "shape_types": dict(sorted(self.shape_types.items())),
+        }
+
+
+class HeapModel:
+    """Model the badge's MicroPython heap and the collection pauses it causes.
+
+    MicroPython frees nothing until the heap fills, then stops the app for a
+    mark-and-sweep collection. CPython frees most objects at once, so its own
+    memory use says little. Instead every allocation made from app code is
+    added up (tracemalloc growth between profile events in app frames, a
+    lower bound as objects made and freed within one call are missed) and
+    fills a HEAP_BYTES heap; a collection runs when it is full, or when the
+    app calls gc.collect(). Each pause is charged to the frame it lands in,
+    and reported with the app lines that allocated most since the last one.
+
+    A collection that leaves less than MIN_FREE_BYTES free is not retried
+    until that much more has been allocated, and one that leaves no room at
+    all is where the badge would raise MemoryError: it is reported, or
+    raised at the end of the frame when `strict`.
+    """
+
+    HEAP_BYTES = 512 * 1024
+    MIN_FREE_BYTES = HEAP_BYTES // 8
+    # Rough pause costs on the RP2350, in microseconds
+    GC_BASE_US = 200.0
+    GC_MARK_US_PER_KB = 20.0    # per KB still live (app objects and images)
+    GC_SWEEP_US_PER_KB = 4.0    # per KB of heap
+    TOP_SITES = 3
+
+    def __init__(self, strict=False):
+        self.strict = strict        # Raise MemoryError when the heap is exhausted
+        self._root = None
+        self._app_files = {}        # filename -> inside the app tree?
+        self._traced = None
+        self._last = 0              # traced bytes at the last profile event
+        self._gc = self.gc_module()
+        self._real_import = None
+        self._import_hook = self._import
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over for the next app; tracing carries on."""
+        self.frame = 0
+        self.allocated = 0          # bytes allocated since the last collection
+        self.live = 0               # bytes that survived the last collection
+        self.frame_allocated = 0
+        self.total_allocated = 0
+        self.frame_pause_us = 0.0
+        self.events = []            # one dict per collection
+        self.sites = {}             # (filename, line) -> bytes since the last collection
+        self.limit = self.HEAP_BYTES  # heap use that triggers the next collection
+        self.exhausted = None       # cause of the first out-of-memory collection
+
+    def start(self, root: str) -> None:
+        """Trace allocations from code under `root` (before the app is imported).
+
+        App modules under `root` that import gc get gc_module() instead; the
+        simulator and everything else keep CPython's.
+        """
+        import tracemalloc
+        self._root = os.path.join(os.path.abspath(root), "")
+        self._app_files.clear()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self._traced = tracemalloc.get_traced_memory
+        self._last = self._traced()[0]
+        if builtins.__import__ is not self._import_hook:
+            self._real_import = builtins.__import__
+            builtins.__import__ = self._import_hook
+        sys.setprofile(self._profile)
+
+    def stop(self) -> None:
+        sys.setprofile(None)
+        if builtins.__import__ is self._import_hook:
+            builtins.__import__ = self._real_import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name == "gc" and level == 0 and globals and self._is_app(globals.get("__file__") or ""):
+            return self._gc
+        return self._real_import(name, globals, locals, fromlist, level)
+
+    def _is_app(self, filename: str) -> bool:
+        inside = self._app_files.get(filename)
+        if inside is None:
+            inside = self._app_files[filename] = filename.startswith(self._root)
+        return inside
+
+    def _profile(self, frame, event, arg) -> None:
+        # Runs on every call and return in the process, so keep it lean
+        app_files = self._app_files
+        filename = frame.f_code.co_filename
+        inside = app_files.get(filename)
+        if inside is None:
+            inside = self._is_app(filename)
+        if not inside:
+            # Simulator calls stand in for badgeware; what they hand back
+            # (shapes, images...) is charged to the app line calling them
+            if event != "call" and event != "return":
+                return
+            frame = frame.f_back
+            if frame is None:
+                return
+            filename = frame.f_code.co_filename
+            inside = app_files.get(filename)
+            if inside is None:
+                inside = self._is_app(filename)
+            if not inside:
+                return
+        current = self._traced()[0]
+        grown = current - self._last
+        self._last = current
+        if grown > 0:
+            self.frame_allocated += grown
+            key = (filename, frame.f_lineno)
+            self.sites[key] = self.sites.get(key, 0) + grown
+            if self.live + self.allocated + self.frame_allocated > self.limit:
+                self.collect(f"heap full at {self._site_name(key)}")
+
+    def _live_bytes(self) -> int:
+        """Bytes a collection would keep: app objects still referenced plus images."""
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, self._root + "*")])
+        live = sum(stat.size for stat in snapshot.statistics("filename"))
+        if _asset_tracker is not None:
+            live += _asset_tracker.current_bytes
+        return live
+
+    def _site_name(self, key) -> str:
+        filename, line = key
+        return f"{os.path.relpath(filename, self._root)}:{line}"
+
+    def collect(self, cause: str) -> None:
+        """Model a collection now, charging its pause to the current frame."""
+        used = self.live + self.allocated + self.frame_allocated
+        self.live = self._live_bytes()
+        pause_us = (self.GC_BASE_US + self.live / 1024 * self.GC_MARK_US_PER_KB
+                    + self.HEAP_BYTES / 1024 * self.GC_SWEEP_US_PER_KB)
+        self.frame_pause_us += pause_us
+        top = sorted(self.sites.items(), key=lambda item: item[1], reverse=True)[:self.TOP_SITES]
+        self.events.append({
+            "frame": self.frame,
+            "cause": cause,
+            "pause_ms": round(pause_us / 1000.0, 3),
+            "heap_kb": round(used / 1024, 1),
+            "live_kb": round(self.live / 1024, 1),
+            "sites": {self._site_name(key): size for key, size in top},
+        })
+        self.total_allocated += self.frame_allocated
+        self.allocated = self.frame_allocated = 0
+        self.sites.clear()
+        # A nearly full heap would otherwise collect again on every allocation
+        self.limit = max(self.HEAP_BYTES, self.live + self.MIN_FREE_BYTES)
+        if self.live >= self.HEAP_BYTES:
+            self.events[-1]["out_of_memory"] = True
+            if self.exhausted is None:
+                self.exhausted = cause
+
+    def end_frame(self) -> float:
+        """Close the current frame; returns the GC pause charged to it in ms.
+
+        With `strict`, raises MemoryError once a collection found the heap
+        exhausted (the profile hook cannot raise into the app itself).
+        """
+        if self.strict and self.exhausted is not None:
+            cause, self.exhausted = self.exhausted, None
+            raise MemoryError(f"badge heap exhausted: {self.live / 1024:.1f}KB still live after "
+                              f"collecting ({cause}), over the {self.HEAP_BYTES // 1024}KB heap")
+        self.allocated += self.frame_allocated
+        self.total_allocated += self.frame_allocated
+        self.frame_allocated = 0
+        pause_us, self.frame_pause_us = self.frame_pause_us, 0.0
+        if _frame_cost is not None:
+            _frame_cost.pause(pause_us)
+        self.frame += 1
+        return pause_us / 1000.0
+
+    def mem_alloc(self) -> int:
+        return min(self.HEAP_BYTES, self.live + self.allocated + self.frame_allocated)
+
+    def gc_module(self) -> ModuleType:
+        """MicroPython-style `gc` for apps: collect() is modelled, the rest is CPython's."""
+        module = ModuleType("gc")
+
+        def collect(*args):
+            caller = sys._getframe(1)
+            cause = "gc.collect()"
+            if self._is_app(caller.f_code.co_filename):
+                cause += f" at {self._site_name((caller.f_code.co_filename, caller.f_lineno))}"
+            self.collect(cause)
+            return gc.collect(*args)
+
+        module.collect = collect
+        module.mem_alloc = self.mem_alloc
+        module.mem_free = lambda: self.HEAP_BYTES - self.mem_alloc()
+        module.__getattr__ = lambda name: getattr(gc, name)
+        return module
+
+    def summary(self) -> dict:
+        pauses = [event["pause_ms"] for event in self.events]
+        frames = max(1, self.frame)
+        return {
+            "collections": len(self.events),
+            "explicit": sum(1 for event in self.events if event["cause"].startswith("gc.collect()")),
+            "out_of_memory": sum(1 for event in self.events if event.get("out_of_memory")),
+            "allocated_kb_per_frame": round(self.total_allocated / 1024 / frames, 2),
+            "pause_ms": _timing_summary(pauses),
+            "events": self.events,
+        }
+
+    def report(self, name: str, limit: int = 5) -> None:
+        """Print the app's collections, longest pauses first."""
+        summary = self.summary()
+        print(f"\n[Heap] {name}: {summary['collections']} collection(s) ({summary['explicit']} explicit) "
+              f"in {self.frame} frames, {summary['allocated_kb_per_frame']:.1f}KB allocated per frame, "
+              f"pause max {summary['pause_ms']['max']:.2f}ms")
+        if summary["out_of_memory"]:
+            print(f"  ⚠️  {summary['out_of_memory']} collection(s) left the heap full; "
+                  f"the badge would raise MemoryError")
+        for event in sorted(self.events, key=lambda event: event["pause_ms"], reverse=True)[:limit]:
+            sites = ", ".join(f"{site} +{size / 1024:.1f}KB" for site, size in event["sites"].items())
+            print(f"  frame {event['frame']}: {event['cause']}, {event['pause_ms']:.2f}ms "
+                  f"(heap {event['heap_kb']:.0f}KB, live {event['live_kb']:.0f}KB)"
+                  + (f" after {sites}" if sites else "")
+                  + (" - out of memory" if event.get("out_of_memory") else ""))
+
+
+_heap_model = None
+
+
+class SamplingProfiler:
+    """Sample the Python stack while app frames run and fold it for flame graphs.
+
+    A profiling timer interrupts the main thread `hz` times a second of CPU
+    time and, while it is inside update() or present(), records its stack
+    from the app's update down. Each sample is weighted by the time since the
+    previous one (a long C call, such as a big blit, delays the signal) and
+    charged to the innermost app or simulator function on the stack; pygame
+    and NumPy calls count towards the simulator function that made them. That
+    splits an app's frame into its own logic and the badgeware calls standing
+    in for the badge firmware. The profiling timer is POSIX-only; without
+    signal.setitimer (Windows) a thread samples instead, which over-counts
+    calls that release the GIL.
+    """
+
+    DEFAULT_HZ = 1000
+    TOP = 8
+
+    def __init__(self, path: str, hz: int = DEFAULT_HZ):
+        import time
+        if hz <= 0:
+            raise ValueError("sample rate must be positive")
+        self.path = path
+        self.interval = 1.0 / hz
+        self.active = False             # main thread is inside a profiled frame
+        self.folded = OrderedDict()     # "app;update (...);..." -> microseconds, all apps
+        self._labels = {}               # code object -> (label, kind)
+        self._boundaries = (run.__code__, benchmark_app.__code__)
+        self._clock = time.perf_counter
+        self._since = 0.0
+        self._thread = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over for the next app; folded stacks already kept stay."""
+        self.samples = 0
+        self.stacks = {}                # folded stack of this app -> microseconds
+        self.self_us = {}               # (kind, label) -> microseconds
+
+    def begin(self) -> None:
+        self._since = self._clock()
+        self.active = True
+
+    def end(self) -> None:
+        self.active = False
+
+    def start(self) -> None:
+        import signal
+        if hasattr(signal, "setitimer"):
+            signal.signal(signal.SIGPROF, lambda signum, frame: self._sample(frame))
+            # Restart system calls the timer interrupts instead of failing with EINTR
+            signal.siginterrupt(signal.SIGPROF, False)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            return
+        import threading
+        main = threading.main_thread().ident
+        self._stop = threading.Event()
+
+        def sample_loop():
+            while not self._stop.wait(self.interval):
+                frame = sys._current_frames().get(main)
+                if frame is not None:
+                    self._sample(frame)
+
+        self._thread = threading.Thread(target=sample_loop, name="badge-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        import signal
+        if self._thread is None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        else:
+            self._stop.set()
+            self._thread.join()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            name = getattr(code, "co_qualname", code.co_name)  # Python 3.11+
+            root = os.path.join(SIM_ROOT or "", "")
+            if filename == __file__:
+                label = (name, "simulator")
+            elif SIM_ROOT and filename.startswith(root):
+                label = (f"{name} ({os.path.relpath(filename, root)})", "app")
+            else:
+                label = (f"{name} ({os.path.basename(filename)})", "library")
+            self._labels[code] = label
+        return label
+
+    def _sample(self, frame) -> None:
+        if not self.active:
+            return
+        now = self._clock()
+        elapsed = int((now - self._since) * 1e6)
+        self._since = now
+        stack = []
+        while frame is not None and frame.f_code not in self._boundaries:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if frame is None or not stack:
+            return      # between frames, or outside run()
+        owner = next((label for label in stack if label[1] != "library"), stack[-1])
+        folded = ";".join(label for label, _ in reversed(stack))
+        self.samples += 1
+        self.stacks[folded] = self.stacks.get(folded, 0) + elapsed
+        key = (owner[1], owner[0])
+        self.self_us[key] = self.self_us.get(key, 0) + elapsed
+
+    def summary(self) -> dict:
+        """Share of samples in app code and the simulator, and the busiest functions."""
+        total = max(1, sum(self.self_us.values()))
+        shares = {"app": 0, "simulator": 0}
+        for (kind, _), us in self.self_us.items():
+            shares[kind] = shares.get(kind, 0) + us
+        top = sorted(self.self_us.items(), key=lambda item: item[1], reverse=True)[:self.TOP]
+        return {
+            "samples": self.samples,
+            "sampled_ms": round(total / 1000.0, 1),
+            "app_pct": round(shares["app"] * 100.0 / total, 1),
+            "simulator_pct": round(shares["simulator"] * 100.0 / total, 1),
+            "top": [{"kind": kind, "function": label, "pct": round(us * 100.0 / total, 1)}
+                    for (kind, label), us in top],
+        }
+
+    def end_app(self, name: str) -> None:
+        """Fold the app's stacks under its name and print where its frames went."""
+        for stack, us in self.stacks.items():
+            key = f"{name};{stack}"
+            self.folded[key] = self.folded.get(key, 0) + us
+        summary = self.summary()
+        print(f"\n[Profile] {name}: {summary['samples']} samples over {summary['sampled_ms']:.0f}ms, "
+              f"app {summary['app_pct']:.0f}%, "
+              f"simulator {summary['simulator_pct']:.0f}%")
+        for entry in summary["top"]:
+            print(f"  {entry['pct']:5.1f}%  {entry['kind']:<9} {entry['function']}")
+        self.reset()
+
+    def write(self) -> None:
+        """Write every app's folded stacks as `frame;frame;... microseconds` lines."""
+        # The output path is the user's, not one inside the badge tree
+        with _real_open(self.path, "w") as f:
+            for stack, us in self.folded.items():
+                f.write(f"{stack} {us}\n")
+
+
+_profiler = None
+
+
+def _finish_profile() -> None:
+    """Stop sampling and write the collapsed stacks of every app profiled."""
+    _profiler.stop()
+    try:
+        _profiler.write()
+    except OSError as e:
+        print(f"[Simulator] Warning: could not write profile '{_profiler.path}': {e}")
+        return
+    print(f"[Simulator] Collapsed stacks written to {_profiler.path} "
+          f"(e.g. flamegraph.pl {_profiler.path} > profile.svg)")
+
+
+_frame_cost = None
+_perf_monitor = None
+
+
+class ImportProfiler:
+    """Time each app module's import: compiling, module-level asset loads and the rest.
+
+    Apps that load fonts and sprite sheets at module level pay for the
+    decode before their first frame; this shows which modules make an app's
+    cold start slow. Times are cumulative per module (`total_ms` includes the
+    modules it imports) with `self_ms` left over for its own code.
+    """
+
+    TOP_ASSETS = 3
+
+    def __init__(self):
+        import time
+        self.clock = time.perf_counter
+        self._stack = []
+        self.modules = []           # finished imports, innermost first
+
+    def reset(self) -> None:
+        """Forget imports made since the last take(), e.g. lazy ones while an app ran."""
+        self.modules = []
+
+    def begin(self, name: str, path: str) -> None:
+        self._stack.append({"module": name, "path": path, "started": self.clock(),
+                            "imports_ms": 0.0, "code": None, "code_ms": 0.0, "assets": []})
+
+    def code(self, source: str, started: float) -> None:
+        """The module's code object came from `source` ("memory", "disk" or "compiled")."""
+        if self._stack:
+            self._stack[-1]["code"] = source
+            self._stack[-1]["code_ms"] = (self.clock() - started) * 1000.0
+
+    def asset(self, kind: str, path: str, started: float) -> None:
+        """An asset load started at `started` finished; charged to the module importing."""
+        if self._stack:
+            self._stack[-1]["assets"].append(
+                {"kind": kind, "path": path, "ms": round((self.clock() - started) * 1000.0, 3)})
+
+    def end(self) -> None:
+        entry = self._stack.pop()
+        total = (self.clock() - entry.pop("started")) * 1000.0
+        imports = entry.pop("imports_ms")
+        if self._stack:
+            self._stack[-1]["imports_ms"] += total
+        assets = sum(asset["ms"] for asset in entry["assets"])
+        if SIM_ROOT:
+            entry["path"] = os.path.relpath(entry["path"], SIM_ROOT)
+        entry.update(total_ms=round(total, 3), self_ms=round(total - imports - entry["code_ms"] - assets, 3),
+                     code_ms=round(entry["code_ms"], 3), assets_ms=round(assets, 3))
+        self.modules.append(entry)
+
+    def take(self) -> dict:
+        """Summary of the imports since the last call, slowest module first."""
+        modules = sorted(self.modules, key=lambda entry: entry["total_ms"], reverse=True)
+        self.modules = []
+        return {
+            "total_ms": round(modules[0]["total_ms"], 3) if modules else 0.0,
+            "compiled": sum(1 for entry in modules if entry["code"] == "compiled"),
+            "modules": modules,
+        }
+
+    def report(self, name: str) -> None:
+        summary = self.take()
+        print(f"[Import] {name}: {summary['total_ms']:.1f}ms, {len(summary['modules'])} module(s), "
+              f"{summary['compiled']} compiled")
+        for entry in summary["modules"]:
+            print(f"  {entry['total_ms']:7.1f}ms  {entry['path']}: code {entry['code_ms']:.1f}ms "
+                  f"({entry['code']}), assets {entry['assets_ms']:.1f}ms ({len(entry['assets'])}), "
+                  f"self {entry['self_ms']:.1f}ms")
+            for asset in sorted(entry["assets"], key=lambda asset: asset["ms"], reverse=True)[:self.TOP_ASSETS]:
+                print(f"             {asset['ms']:7.1f}ms  {asset['kind']} {asset['path']}")
+
+
+_import_profiler = None
+
+
+class StartupTimer:
+    """Time to first frame per app, split into import, init() and the first frame.
+
+    Each phase records its host time and the assets it decodes, in bytes as
+    held on the badge (see AssetTracker.image_bytes; fonts by file size).
+    Decoding dominates launches on the badge, so each phase also gets a badge
+    estimate for its image decodes priced like FrameCostEstimator's; under
+    --perf the first frame gets its full frame estimate instead. Other Python
+    work done at startup is only reflected in the host times.
+    """
+
+    PHASES = ("import", "init", "first_frame")
+
+    def __init__(self, costs=None):
+        import time
+        self.clock = time.perf_counter
+        self.decode_us = dict(FrameCostEstimator.DEFAULT_COSTS, **(costs or {}))["decode_pixel"]
+        self.reset()
+
+    def reset(self, app: str = "app") -> None:
+        self.app = app
+        self.phases = {}
+        self._phase = None
+        self._started = 0.0
+
+    def begin(self, phase: str, app: str = None) -> None:
+        """Start timing `phase`; "import" starts a new launch of `app`."""
+        if phase == "import":
+            self.reset(app or "app")
+        self._phase = phase
+        self.phases[phase] = {"ms": 0.0, "decodes": 0, "decode_kb": 0.0, "badge_ms": 0.0}
+        self._started = self.clock()
+
+    def end(self) -> None:
+        entry = self.phases[self._phase]
+        entry["ms"] = round((self.clock() - self._started) * 1000.0, 3)
+        if self._phase == "first_frame" and _frame_cost is not None and _frame_cost.frame_ms:
+            # Import and init decodes are still counted in the estimator's first frame
+            earlier = sum(self.phases[phase]["badge_ms"] for phase in ("import", "init")
+                          if phase in self.phases)
+            entry["badge_ms"] = max(0.0, _frame_cost.frame_ms[-1] - earlier)
+        entry["badge_ms"] = round(entry["badge_ms"], 3)
+        entry["decode_kb"] = round(entry["decode_kb"], 1)
+        self._phase = None
+
+    @property
+    def started(self) -> bool:
+        """True once the app's first frame has been timed."""
+        return "first_frame" in self.phases and self._phase is None
+
+    def decode(self, size: int, pixels: int = 0) -> None:
+        """An asset of `size` badge bytes (`pixels` decoded) was loaded in the current phase."""
+        if self._phase is not None:
+            entry = self.phases[self._phase]
+            entry["decodes"] += 1
+            entry["decode_kb"] += size / 1024
+            entry["badge_ms"] += pixels * self.decode_us / 1000.0
+
+    def summary(self) -> dict:
+        return {
+            "total_ms": round(sum(entry["ms"] for entry in self.phases.values()), 3),
+            "badge_ms": round(sum(entry["badge_ms"] for entry in self.phases.values()), 3),
+            "phases": {phase: self.phases[phase] for phase in self.PHASES if phase in self.phases},
+        }
+
+    def report(self) -> None:
+        summary = self.summary()
+        phases = ", ".join(
+            f"{phase.replace('_', ' ')} {entry['ms']:.1f}ms ({entry['decode_kb']:.1f}KB decoded, "
+            f"badge~{entry['badge_ms']:.1f}ms)"
+            for phase, entry in summary["phases"].items())
+        print(f"[Startup] {self.app}: first frame after {summary['total_ms']:.1f}ms "
+              f"(badge~{summary['badge_ms']:.1f}ms): {phases}")
+
+
+_startup = None
 
 
 class PerformanceMonitor:
-    """Track and display CPU, memory usage, and badge asset estimates."""
+    """Track and display badge frame-time, memory and asset estimates."""
     
-    def __init__(self, enabled=False):
+    def __init__(self, enabled=False, frame_cost=None, asset_tracker=None):
         self.enabled = enabled
         if enabled:
             import psutil
@@ -1665,7 +4488,8 @@ class PerformanceMonitor:
             self.baseline_memory = None  # Track baseline after first app loads
             self.initial_memory = None   # Track memory at first measurement
             self.peak_memory = 0         # Track peak memory growth
-            self.asset_tracker = AssetTracker()  # Track loaded assets
+            self.asset_tracker = asset_tracker or AssetTracker()  # Track loaded assets
+            self.frame_cost = frame_cost or FrameCostEstimator()  # Badge frame-time estimate
     
     def set_baseline(self):
         """Set the baseline memory after app loads and first frame renders."""
@@ -1694,19 +4518,15 @@ class PerformanceMonitor:
             self.set_baseline()
             return
         
-        # Get FPS from pygame clock
+        # Host frame rate, for reference only
         fps = clock.get_fps()
         
-        # Calculate frame time in milliseconds (more meaningful than CPU%)
-        # Badge target is 60 FPS = 16.67ms per frame
-        # If frame time > 16.67ms, badge will drop frames
-        frame_time_ms = (1000.0 / fps) if fps > 0 else 0
-        
-        # Estimate badge CPU usage based on frame time
-        # Badge has ~16.67ms budget at 60 FPS
-        # If we're taking longer, we're "over budget"
-        badge_frame_budget_ms = 16.67
-        frame_budget_percent = (frame_time_ms / badge_frame_budget_ms) * 100
+        # Estimated badge frame time from the drawing done since the last line.
+        # Badge target is 60 FPS = 16.67ms per frame; slower frames drop.
+        frame_cost = self.frame_cost
+        frame_time_ms, worst_frame_ms, shapes_per_frame, aa_factor = frame_cost.take()
+        badge_frame_budget_ms = FrameCostEstimator.FRAME_BUDGET_MS
+        badge_fps = min(60.0, 1000.0 / frame_time_ms) if frame_time_ms > 0 else 0.0
         
         # Get CPU usage (percentage for this process)
         cpu_percent = self.process.cpu_percent(interval=0.1)
@@ -1725,46 +4545,274 @@ class PerformanceMonitor:
         
         # Get estimated badge memory from asset tracking
         estimated_badge_kb = self.asset_tracker.get_total_kb()
+        peak_badge_kb = self.asset_tracker.get_peak_kb()
         largest_image_kb = self.asset_tracker.get_largest_image_kb()
         image_count = len(self.asset_tracker.images)
         font_count = len(self.asset_tracker.fonts)
+        tess_hit_rate = _tessellation_cache.hit_rate()
+        decode_hit_rate, decode_kb = self.asset_tracker.get_decode_cache_stats()
         
-        # Badge has 512KB SRAM total, but realistically apps have ~300-400KB available
-        # (system uses some for badgeware, drivers, etc.)
-        badge_available_kb = 400
+        badge_available_kb = AssetTracker.BUDGET_KB
         
-        # Status based on estimated badge memory
-        if estimated_badge_kb > badge_available_kb:
+        # Status based on the app's peak estimated badge memory
+        if peak_badge_kb > badge_available_kb:
             warning = " ⚠️  OVER LIMIT!"
-        elif estimated_badge_kb > badge_available_kb * 0.75:
+        elif peak_badge_kb > badge_available_kb * 0.75:
             warning = " ⚡ High"
-        elif estimated_badge_kb > badge_available_kb * 0.50:
+        elif peak_badge_kb > badge_available_kb * 0.50:
             warning = " ⚡ Med"
         else:
             warning = " ✓"
         
-        # CPU status based on frame budget (more meaningful than CPU%)
+        # CPU status based on the estimated badge frame budget
         # Badge needs to complete each frame in 16.67ms to maintain 60 FPS
         if frame_time_ms > badge_frame_budget_ms * 1.5:
             cpu_status = " ⚠️  Slow!"
-        elif frame_time_ms > badge_frame_budget_ms:
+        elif worst_frame_ms > badge_frame_budget_ms:
             cpu_status = " ⚡"
         else:
             cpu_status = " ✓"
         
-        # Display with both Python memory and badge estimates
-        print(f"\r[Perf] FPS:{fps:5.1f} Frame:{frame_time_ms:5.1f}ms{cpu_status} | "
-              f"Badge~{estimated_badge_kb:5.1f}KB{warning} | "
-              f"Imgs:{image_count}({largest_image_kb:5.1f}KB) Fonts:{font_count}", 
+        # Display badge estimates, with the host frame rate for reference
+        print(f"\r[Perf] FPS:{badge_fps:5.1f} Frame:{frame_time_ms:5.1f}ms (max {worst_frame_ms:5.1f}){cpu_status} | "
+              f"Host:{fps:5.1f}FPS | "
+              f"Badge~{estimated_badge_kb:5.1f}KB (peak {peak_badge_kb:5.1f}){warning} | "
+              f"Imgs:{image_count}({largest_image_kb:5.1f}KB) Fonts:{font_count} | "
+              f"Tess:{tess_hit_rate:3.0f}% ({_tessellation_cache.hits}/{_tessellation_cache.misses}) | "
+              f"Decode:{decode_hit_rate:3.0f}% {decode_kb:6.0f}KB | "
+              f"Shapes:{shapes_per_frame:4.0f}/f AA x{aa_factor:4.1f}",
               end='', flush=True)
 
+# -----------------------------------------------------------------------------
+# Benchmark
+# -----------------------------------------------------------------------------
+
+def _percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _timing_summary(samples) -> dict:
+    return {
+        "p50": round(_percentile(samples, 50), 4),
+        "p95": round(_percentile(samples, 95), 4),
+        "p99": round(_percentile(samples, 99), 4),
+        "max": round(max(samples), 4) if samples else 0.0,
+    }
+
+
+def benchmark_app(app_dir: str, frames: int, fps: int = 60, script: str = None, seed: int = 0) -> dict:
+    """Run one app for `frames` frames and return its per-frame timing summary.
+
+    Input comes from the `script` trace (see --record) or is left idle; time
+    is driven by a FrameClock so every run sees identical io.ticks.
+    """
+    import random
+    import time
+
+    global io, _frame_clock
+    _frame_clock = FrameClock()
+    replay = InputTrace(script) if script else None
+    io = IO(clock=_frame_clock, replay=replay)
+    random.seed(seed)
+
+    if _startup is not None:
+        _startup.begin("import", os.path.basename(os.path.normpath(app_dir)))
+    module = load_game_module(os.path.join(app_dir, "__init__.py"))
+    if _startup is not None:
+        _startup.end()
+    imports = _import_profiler.take() if _import_profiler is not None else None
+    update_func = getattr(module, "update", None)
+    if not callable(update_func):
+        raise ImportError("module has no 'update' function")
+
+    init_func = getattr(module, "init", None)
+    exit_func = getattr(module, "on_exit", None)
+    update_ms = []
+    present_ms = []
+    frame_ms = []
+    try:
+        if callable(init_func):
+            if _startup is not None:
+                _startup.begin("init")
+            try:
+                init_func()
+            finally:
+                if _startup is not None:
+                    _startup.end()
+        for _ in range(frames):
+            io.update()
+            if io.replay_finished or IO.BUTTON_HOME in io.pressed:
+                break
+            timing_start = _startup is not None and not _startup.started
+            if timing_start:
+                _startup.begin("first_frame")
+            if _profiler is not None:
+                _profiler.begin()
+            start = time.perf_counter()
+            result = update_func()
+            updated = time.perf_counter()
+            screen.present()
+            presented = time.perf_counter()
+            if _profiler is not None:
+                _profiler.end()
+            _frame_clock.tick(fps)
+            if _heap_model is not None:
+                _heap_model.end_frame()
+            if _frame_cost is not None:
+                _frame_cost.end_frame()
+            if timing_start:
+                _startup.end()
+            if _state_writer.pending:
+                _state_writer.tick()
+            update_ms.append((updated - start) * 1000.0)
+            present_ms.append((presented - updated) * 1000.0)
+            frame_ms.append((presented - start) * 1000.0)
+            if result is not None:
+                break
+    finally:
+        if callable(exit_func):
+            try:
+                exit_func()
+            except Exception:
+                traceback.print_exc()
+        _state_writer.flush()
+
+    stats = {
+        "frames": len(frame_ms),
+        "update_ms": _timing_summary(update_ms),
+        "present_ms": _timing_summary(present_ms),
+        "frame_ms": _timing_summary(frame_ms),
+    }
+    if _frame_cost is not None:
+        stats["badge"] = _frame_cost.summary()
+    if _asset_tracker is not None:
+        stats["badge"]["memory"] = _asset_tracker.summary()
+    if _heap_model is not None:
+        stats["heap"] = _heap_model.summary()
+    if _profiler is not None:
+        stats["profile"] = _profiler.summary()
+    if imports is not None:
+        stats["import"] = imports
+    if _startup is not None:
+        stats["startup"] = _startup.summary()
+    return stats
+
+
+def run_benchmark(app_dirs, frames: int, report_path: str, script: str = None,
+                  baseline_path: str = None, tolerance: float = 10.0, seed: int = 0,
+                  device_costs: dict = None, strict_memory: bool = False, heap: bool = False) -> int:
+    """Benchmark each app, write a JSON report and compare against a baseline.
+
+    Each app also gets a badge frame-time estimate (see FrameCostEstimator,
+    priced with `device_costs`); apps estimated to drop below 60 FPS on the
+    badge are listed but do not fail the run. Badge asset memory is tracked
+    too; with `strict_memory` an app over AssetTracker.BUDGET_KB fails. With
+    `heap`, each app runs against a HeapModel and its collections are reported.
+
+    Returns a process exit code: 1 if any app's median frame time regressed
+    by more than `tolerance` percent against the baseline or, with
+    `strict_memory`, ran out of badge memory, otherwise 0.
+    """
+    global _frame_cost, _asset_tracker, _heap_model
+    report = {"frames": frames, "script": script, "apps": {}}
+    if heap:
+        _heap_model = HeapModel(strict=strict_memory)
+    slow_on_badge = []
+    out_of_memory = []
+    for app_dir in app_dirs:
+        name = os.path.basename(os.path.normpath(app_dir))
+        print(f"[Benchmark] {name} ...", end="", flush=True)
+        _frame_cost = FrameCostEstimator(device_costs)
+        _asset_tracker = AssetTracker(strict=strict_memory)
+        try:
+            stats = benchmark_app(app_dir, frames, script=script, seed=seed)
+        except SystemExit:
+            raise
+        except MemoryError as e:
+            print(f" failed: {e}")
+            report["apps"][name] = {"error": f"MemoryError: {e}"}
+            out_of_memory.append(f"{name}: {e}")
+        except Exception as e:
+            print(f" failed: {e}")
+            report["apps"][name] = {"error": str(e)}
+        else:
+            frame = stats["frame_ms"]
+            badge = stats["badge"]
+            print(f" {stats['frames']} frames, p50 {frame['p50']:.3f}ms p95 {frame['p95']:.3f}ms "
+                  f"p99 {frame['p99']:.3f}ms max {frame['max']:.3f}ms | "
+                  f"badge~ p50 {badge['frame_ms']['p50']:.1f}ms p95 {badge['frame_ms']['p95']:.1f}ms "
+                  f"peak {badge['memory']['peak_kb']:.1f}KB"
+                  + (f" | {stats['heap']['collections']} GC(s), max {stats['heap']['pause_ms']['max']:.2f}ms"
+                     if heap else "")
+                  + (f" | import {stats['import']['total_ms']:.1f}ms" if "import" in stats else "")
+                  + (f" | first frame {stats['startup']['total_ms']:.1f}ms "
+                     f"(badge~{stats['startup']['badge_ms']:.1f}ms)" if "startup" in stats else ""))
+            if badge["slow_frames"]:
+                slow_on_badge.append(f"{name}: {badge['slow_frames']}/{stats['frames']} frames over "
+                                     f"{FrameCostEstimator.FRAME_BUDGET_MS:.2f}ms, "
+                                     f"max {badge['frame_ms']['max']:.1f}ms")
+            report["apps"][name] = stats
+        _unload_app(app_dir)
+    if _heap_model is not None:
+        _heap_model.stop()
+    _frame_cost = _asset_tracker = _heap_model = None
+    _cleanup_pycache()
+
+    if slow_on_badge:
+        print(f"[Benchmark] {len(slow_on_badge)} app(s) estimated to drop below 60 FPS on the badge:")
+        for line in slow_on_badge:
+            print(f"  {line}")
+
+    with _real_open(report_path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"[Benchmark] Report written to {report_path}")
+
+    if out_of_memory:
+        print(f"[Benchmark] {len(out_of_memory)} app(s) over the {AssetTracker.BUDGET_KB}KB badge memory budget:")
+        for line in out_of_memory:
+            print(f"  {line}")
+    failed = 1 if out_of_memory else 0
+
+    if not baseline_path:
+        return failed
+
+    with _real_open(baseline_path, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh)
+
+    regressions = []
+    for name, stats in report["apps"].items():
+        base = baseline.get("apps", {}).get(name)
+        if not base or "frame_ms" not in base:
+            continue
+        if "frame_ms" not in stats:
+            regressions.append(f"{name}: {stats.get('error', 'no result')}")
+            continue
+        before = base["frame_ms"]["p50"]
+        after = stats["frame_ms"]["p50"]
+        if before > 0 and after > before * (1.0 + tolerance / 100.0):
+            slower = (after / before - 1.0) * 100.0
+            regressions.append(f"{name}: p50 {before:.3f}ms -> {after:.3f}ms (+{slower:.1f}%)")
+
+    if regressions:
+        print(f"[Benchmark] {len(regressions)} app(s) slower than baseline by more than {tolerance:g}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"[Benchmark] No regressions over {tolerance:g}% against {baseline_path}")
+    return failed
+
 # -----------------------------------------------------------------------------
 # Entry point
 # -----------------------------------------------------------------------------
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run a GitHub Badge game locally using Pygame.")
-    parser.add_argument("game", help="Path to the game .py, directory containing __init__.py, or a dotted module name.")
+    parser.add_argument("game", nargs="?", help="Path to the game .py, directory containing __init__.py, or a dotted module name.")
     parser.add_argument("--scale", type=int, default=4, help="Scale factor (default: 4)")
     parser.add_argument(
         "-C",
@@ -1789,7 +4837,153 @@ def main() -> None:
         action="store_true",
         help="Show live performance metrics (CPU and memory usage) in terminal.",
     )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Render off-screen with the SDL dummy driver and drive io.ticks from a virtual clock.",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        metavar="N",
+        help="Exit after N frames in total (useful with --headless for soak runs).",
+    )
+    parser.add_argument(
+        "--step-ms",
+        dest="step_ms",
+        type=float,
+        metavar="MS",
+        help="Virtual milliseconds per frame in headless mode (default: 1000 / fps).",
+    )
+    trace_group = parser.add_mutually_exclusive_group()
+    trace_group.add_argument(
+        "--record",
+        metavar="FILE",
+        help="Record per-frame button input and tick deltas to FILE (JSON lines).",
+    )
+    trace_group.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="Replay input recorded with --record instead of reading the keyboard.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed the random number generator (stored in --record traces).",
+    )
+    parser.add_argument(
+        "--benchmark",
+        metavar="REPORT",
+        help="Benchmark every app in apps/ (or just GAME) off-screen and write a JSON timing report.",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Benchmark report to compare against; exits non-zero on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=10.0,
+        metavar="PCT",
+        help="Allowed median frame-time slowdown against --baseline in percent (default: 10).",
+    )
+    parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help="Rasterize shapes with the NumPy backend (requires numpy).",
+    )
+    parser.add_argument(
+        "--strict-memory",
+        dest="strict_memory",
+        action="store_true",
+        help="Raise MemoryError when an app's estimated badge asset memory exceeds 400KB (with --perf or --benchmark).",
+    )
+    parser.add_argument(
+        "--heap",
+        action="store_true",
+        help="Model the badge's 512KB MicroPython heap and report GC pauses per frame (slows apps down; needs --perf or --benchmark; "
+             "with --strict-memory an exhausted heap raises MemoryError).",
+    )
+    parser.add_argument(
+        "--state-interval",
+        dest="state_interval",
+        type=int,
+        default=_StateWriter.DEFAULT_INTERVAL_MS,
+        metavar="MS",
+        help=f"Write each app's saved State at most once per MS of badge time, and on exit "
+             f"(default: {_StateWriter.DEFAULT_INTERVAL_MS}; 0 writes every save).",
+    )
+    parser.add_argument(
+        "--state-format",
+        dest="state_format",
+        choices=("json", "binary"),
+        default="json",
+        help="Encoding of saved State files (default: json).",
+    )
+    parser.add_argument(
+        "--http-server",
+        dest="http_server",
+        metavar="URL|DIR",
+        help="Send every app HTTP request to this server instead, or serve DIR/HOST/PATH files "
+             "from a local stand-in server.",
+    )
+    parser.add_argument(
+        "--http-timing",
+        dest="http_timing",
+        action="store_true",
+        help="Print DNS, connect, time-to-first-byte and transfer times of every app HTTP request.",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Switch apps without rebuilding the mock modules or recompiling app code.",
+    )
+    parser.add_argument(
+        "--import-profile",
+        dest="import_profile",
+        action="store_true",
+        help="Report how long each app module takes to import, including module-level asset loads.",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Report each app's time to first frame, split into import, init() and the first frame.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Sample where each app's frame time goes and write collapsed stacks for flame-graph tools to FILE.",
+    )
+    parser.add_argument(
+        "--profile-hz",
+        dest="profile_hz",
+        type=int,
+        default=SamplingProfiler.DEFAULT_HZ,
+        metavar="HZ",
+        help=f"Stack samples per second for --profile (default: {SamplingProfiler.DEFAULT_HZ}).",
+    )
+    parser.add_argument(
+        "--device-costs",
+        dest="device_costs",
+        metavar="FILE",
+        help="JSON object overriding the badge cost table used by --perf and --benchmark frame estimates.",
+    )
     args = parser.parse_args()
+    if args.game is None and not args.benchmark:
+        parser.error("the following arguments are required: game")
+    if args.benchmark and args.record:
+        parser.error("--record cannot be combined with --benchmark")
+    if args.heap and not (args.perf or args.benchmark):
+        parser.error("--heap needs --perf or --benchmark")
+    device_costs = None
+    if args.device_costs:
+        try:
+            device_costs = FrameCostEstimator.load(args.device_costs).costs
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read device costs '{args.device_costs}': {e}")
+    if args.profile_hz <= 0:
+        parser.error("--profile-hz must be positive")
     
     # Clean temporary files if requested
     if args.clean:
@@ -1804,11 +4998,16 @@ def main() -> None:
                 print(f"Warning: Could not clean temporary files: {e}")
     
     # Initialize performance monitoring
-    global _perf_monitor
+    global _perf_monitor, _frame_cost, _asset_tracker, _heap_model
     if args.perf:
         try:
             import psutil  # type: ignore
-            _perf_monitor = PerformanceMonitor(enabled=True)
+            _frame_cost = FrameCostEstimator(device_costs)
+            _asset_tracker = AssetTracker(strict=args.strict_memory)
+            _perf_monitor = PerformanceMonitor(enabled=True, frame_cost=_frame_cost,
+                                               asset_tracker=_asset_tracker)
+            if args.heap:
+                _heap_model = HeapModel(strict=args.strict_memory)
             print("[Simulator] Performance monitoring enabled")
         except ImportError:
             print("[Simulator] Warning: psutil not installed. Install with 'pip install psutil' to enable --perf")
@@ -1817,11 +5016,95 @@ def main() -> None:
     else:
         _perf_monitor = None
 
+    # App modules compile through the bytecode cache; --warm also keeps them in memory
+    global _warm
+    sys.meta_path.insert(0, _AppFinder)
+    _warm = args.warm
+
+    global _import_profiler
+    if args.import_profile:
+        _import_profiler = ImportProfiler()
+
+    # Pooled connections (and the stand-in server) are closed on every exit path
+    import atexit
+    atexit.register(_http_pool.close)
+    if args.http_server:
+        if os.path.isdir(args.http_server):
+            stand_in = _StandInServer(args.http_server)
+            atexit.register(stand_in.close)
+            _http_pool.stand_in = ("http",) + stand_in.address
+            print(f"[Simulator] Serving HTTP requests from {args.http_server} "
+                  f"on http://{stand_in.address[0]}:{stand_in.address[1]}")
+        else:
+            parts = _real_urllib_parse.urlsplit(args.http_server)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                parser.error(f"--http-server needs an http(s):// URL or a directory, not '{args.http_server}'")
+            _http_pool.stand_in = (parts.scheme, parts.hostname,
+                                   parts.port or (443 if parts.scheme == "https" else 80))
+            print(f"[Simulator] Sending HTTP requests to {args.http_server}")
+    _http_pool.verbose = args.http_timing
+
+    _state_writer.interval_ms = max(0, args.state_interval)
+    _state_writer.binary = args.state_format == "binary"
+
+    global _startup
+    if args.startup:
+        _startup = StartupTimer(device_costs)
+
+    global _profiler
+    if args.profile:
+        _profiler = SamplingProfiler(args.profile, args.profile_hz)
+        _profiler.start()
+        print(f"[Simulator] Profiling at {args.profile_hz}Hz, collapsed stacks go to {args.profile}")
+
+    global _rasterize
+    if args.numpy:
+        if np is None:
+            print("[Simulator] Warning: numpy not installed. Install with 'pip install numpy' to enable --numpy")
+            print("[Simulator] Continuing with the default rasterizer...")
+        else:
+            _rasterize = _render_shape_numpy
+            print("[Simulator] NumPy rasterizer enabled")
+
+    global _frame_clock, _max_frames
+    if args.benchmark:
+        # Benchmarks never open a window but still present every frame
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if args.headless:
+        # Must be set before pygame.init() so SDL never opens a real window
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        _frame_clock = FrameClock(args.step_ms)
+    _max_frames = args.frames
+
+    # Input traces; a replay reuses the recorded seed unless --seed overrides it
+    import random
+    recorder = replay = None
+    seed = args.seed
+    if args.replay:
+        try:
+            replay = InputTrace(args.replay)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read input trace '{args.replay}': {e}", file=sys.stderr)
+            sys.exit(2)
+        if seed is None:
+            seed = replay.seed
+        print(f"[Simulator] Replaying {len(replay.frames)} frames from {args.replay}")
+    elif args.record:
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        recorder = InputTrace(args.record, "w", seed=seed)
+        atexit.register(recorder.close)
+        print(f"[Simulator] Recording input to {args.record}")
+    if seed is not None:
+        random.seed(seed)
+
     pygame.init()
 
     global screen, io, SIM_ROOT
-    screen = Screen(scale=args.scale, screenshot_dir=args.screenshot_dir)
-    io = IO()
+    screen = Screen(scale=args.scale, screenshot_dir=args.screenshot_dir, headless=args.headless)
+    io = IO(clock=_frame_clock, recorder=recorder, replay=replay)
     
     # Set system root with default to ./badge relative to simulator
     if args.system_root:
@@ -1840,12 +5123,41 @@ def main() -> None:
         else:
             SIM_ROOT = _find_sim_root(os.getcwd())
     
+    if args.benchmark:
+        if args.game:
+            app_dirs = [os.path.abspath(args.game)]
+        else:
+            apps_root = os.path.join(SIM_ROOT, "apps")
+            app_dirs = [
+                os.path.join(apps_root, name)
+                for name in sorted(os.listdir(apps_root))
+                if os.path.isfile(os.path.join(apps_root, name, "__init__.py"))
+            ]
+        code = run_benchmark(
+            app_dirs,
+            args.frames or 600,
+            args.benchmark,
+            script=args.replay,
+            baseline_path=args.baseline,
+            tolerance=args.tolerance,
+            seed=args.seed if args.seed is not None else 0,
+            device_costs=device_costs,
+            strict_memory=args.strict_memory,
+            heap=args.heap,
+        )
+        if _profiler is not None:
+            _finish_profile()
+        pygame.quit()
+        sys.exit(code)
+
     # Performance monitor will set baseline automatically after first app loads
     if _perf_monitor:
         print("[Simulator] Memory profiler enabled - tracking memory growth (baseline set after app loads)")
     
     # Main app loop - allows apps to launch other apps
+    import time
     current_app = args.game
+    switch_started = None
     
     while True:
         # If current_app is a directory, append __init__.py
@@ -1877,7 +5189,11 @@ def main() -> None:
                 screen.set_icon(icon_path)
 
         try:
+            if _startup is not None:
+                _startup.begin("import", app_name)
             module = load_game_module(game_path)
+            if _startup is not None:
+                _startup.end()
         except SystemExit:
             raise
         except Exception as e:
@@ -1885,6 +5201,13 @@ def main() -> None:
             traceback.print_exc()
             pygame.quit()
             sys.exit(1)
+        if _import_profiler is not None:
+            _import_profiler.report(app_name)
+        if switch_started is not None:
+            print(f"[Simulator] Switched to {app_name} in "
+                  f"{(time.perf_counter() - switch_started) * 1000.0:.1f}ms"
+                  + (f" (warm, {_code_cache.hits} cached / {_code_cache.misses} loaded modules so far)"
+                     if _warm else ""))
 
         if not hasattr(module, "update"):
             print("Loaded module has no 'update' function", file=sys.stderr)
@@ -1902,48 +5225,9 @@ def main() -> None:
                 if os.path.isdir(menu_path) and os.path.isfile(os.path.join(menu_path, "__init__.py")):
                     print(f"\n[Simulator] Returning to menu")
                     current_app = menu_path
+                    switch_started = time.perf_counter()
                     
-                    # Clean up sys.path entries added by the previous app
-                    if game_dir:
-                        game_dir_abs = os.path.abspath(game_dir)
-                        paths_to_remove = [p for p in sys.path if os.path.abspath(p).startswith(game_dir_abs)]
-                        for p in paths_to_remove:
-                            while p in sys.path:
-                                sys.path.remove(p)
-                    
-                    # Clean up module cache for clean reload
-                    modules_to_remove = []
-                    for mod_name, mod in sys.modules.items():
-                        if mod and hasattr(mod, "__file__") and mod.__file__:
-                            mod_file = os.path.abspath(mod.__file__)
-                            if game_dir and mod_file.startswith(game_dir):
-                                modules_to_remove.append(mod_name)
-                    
-                    for mod_name in modules_to_remove:
-                        del sys.modules[mod_name]
-                    
-                    # Also remove the main module loaded as "badge_game"
-                    if "badge_game" in sys.modules:
-                        del sys.modules["badge_game"]
-                    
-                    # Also remove common app modules that can conflict (like ui, icon)
-                    # These will be re-imported fresh when the menu loads
-                    for common_mod in ["ui", "icon", "beacon", "mona"]:
-                        if common_mod in sys.modules:
-                            del sys.modules[common_mod]
-                    
-                    # Clear image cache to simulate badge behavior (old app's images are freed)
-                    Image._cache.clear()
-                    
-                    # Reset asset tracker when returning to menu
-                    if _perf_monitor and _perf_monitor.enabled:
-                        _perf_monitor.asset_tracker.reset()
-                    
-                    # Force garbage collection to free memory
-                    import gc
-                    collected = gc.collect()
-                    if collected > 0:
-                        print(f"[Simulator] Garbage collected {collected} objects")
+                    _unload_app(game_dir)
                     
                     # Continue to next iteration to load the menu
                     continue
@@ -1958,48 +5242,9 @@ def main() -> None:
                 if os.path.isdir(result_path) and os.path.isfile(os.path.join(result_path, "__init__.py")):
                     print(f"\n[Simulator] Launching app: {result}")
                     current_app = result_path
+                    switch_started = time.perf_counter()
                     
-                    # Clean up sys.path entries added by the previous app
-                    if game_dir:
-                        game_dir_abs = os.path.abspath(game_dir)
-                        paths_to_remove = [p for p in sys.path if os.path.abspath(p).startswith(game_dir_abs)]
-                        for p in paths_to_remove:
-                            while p in sys.path:
-                                sys.path.remove(p)
-                    
-                    # Clean up module cache for clean reload
-                    # Remove all modules that were loaded from the previous app
-                    modules_to_remove = []
-                    for mod_name, mod in sys.modules.items():
-                        if mod and hasattr(mod, "__file__") and mod.__file__:
-                            mod_file = os.path.abspath(mod.__file__)
-                            if game_dir and mod_file.startswith(game_dir):
-                                modules_to_remove.append(mod_name)
-                    
-                    for mod_name in modules_to_remove:
-                        del sys.modules[mod_name]
-                    
-                    # Also remove the main module loaded as "badge_game"
-                    if "badge_game" in sys.modules:
-                        del sys.modules["badge_game"]
-                    
-                    # Also remove common app modules that can conflict (like ui, icon)
-                    for common_mod in ["ui", "icon", "beacon", "mona"]:
-                        if common_mod in sys.modules:
-                            del sys.modules[common_mod]
-                    
-                    # Clear image cache to simulate badge behavior (old app's images are freed)
-                    Image._cache.clear()
-                    
-                    # Reset asset tracker when switching apps
-                    if _perf_monitor and _perf_monitor.enabled:
-                        _perf_monitor.asset_tracker.reset()
-                    
-                    # Force garbage collection to free memory
-                    import gc
-                    collected = gc.collect()
-                    if collected > 0:
-                        print(f"[Simulator] Garbage collected {collected} objects")
+                    _unload_app(game_dir)
                     
                     # Continue to next iteration to load the new app
                     continue
@@ -2019,8 +5264,13 @@ def main() -> None:
             sys.exit(1)
     
     # Clean up and exit
+    _end_app_reports(app_name)
+    if _heap_model is not None:
+        _heap_model.stop()
     if _perf_monitor and _perf_monitor.enabled:
         print()  # Newline after performance metrics
+    if _profiler is not None:
+        _finish_profile()
     pygame.quit()
 
 
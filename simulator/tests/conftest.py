@@ -0,0 +1,19 @@
+import os
+import sys
+
+# No real window: SDL's dummy driver still gives Screen a display surface
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import pytest
+
+import badge_simulator as sim
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield sim.Screen()
+    pygame.quit()
@@ -0,0 +1,13 @@
+import pygame
+
+import badge_simulator as sim
+
+
+def test_fallback_font_renders_whole_strings(screen):
+    font = sim.PixelFont.load("/system/assets/fonts/missing.ppf", 14)
+    text = "AVATAR To"
+    expected = pygame.font.Font(None, 14).render(text, True, (255, 0, 0))
+    surface = font.render(text, True, (255, 0, 0))
+    assert font.size(text) == expected.get_size()
+    assert pygame.image.tobytes(surface, "RGBA") == pygame.image.tobytes(expected, "RGBA")
+    assert font.render(text, True, (255, 0, 0)) is surface
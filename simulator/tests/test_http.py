@@ -0,0 +1,80 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+import badge_simulator as sim
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 0.2           # the server drops a connection idle this long
+
+    def _answer(self, status, body=b"", **headers):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/moved":
+            self._answer(302, Location="/data")
+        else:
+            self._answer(200, b"GET " + self.path.encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/moved":
+            self._answer(302, Location="/data")
+        else:
+            self._answer(200, b"POST " + body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pool():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = sim._HTTPPool()
+    pool.stand_in = ("http",) + server.server_address[:2]
+    yield pool
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(pool, path, data=None):
+    with pool.request("http://example.test" + path, data=data) as response:
+        return response.read()
+
+
+def test_connection_is_reused(pool):
+    assert fetch(pool, "/a") == b"GET /a"
+    assert fetch(pool, "/b") == b"GET /b"
+    assert pool.connections == 1
+    assert [timing["reused"] for timing in pool.requests] == [False, True]
+
+
+def test_post_after_server_closed_connection(pool):
+    fetch(pool, "/a")
+    time.sleep(0.5)
+    assert fetch(pool, "/data", b"x=1") == b"POST x=1"
+    assert pool.connections == 2
+
+
+def test_get_is_retried_on_dropped_connection(pool, monkeypatch):
+    fetch(pool, "/a")
+    time.sleep(0.5)
+    # Miss the server's close, as when it races with the request
+    monkeypatch.setattr(sim.select, "select", lambda *args: ([], [], []))
+    assert fetch(pool, "/b") == b"GET /b"
+    assert pool.connections == 2
+
+
+def test_redirected_post_becomes_get(pool):
+    assert fetch(pool, "/moved", b"x=1") == b"GET /data"
@@ -0,0 +1,53 @@
+"""Copy-on-write Images sharing the decode cache's surfaces."""
+
+import pygame
+
+import badge_simulator as sim
+
+
+def shared_image(size=(8, 8), color=(10, 20, 30)):
+    source = pygame.Surface(size, pygame.SRCALPHA)
+    source.fill(color)
+    return source, sim.Image(_surface=source, _shared=True)
+
+
+def test_reads_do_not_copy(screen):
+    source, image = shared_image()
+    assert image.get_size() == (8, 8)
+    assert tuple(image.get_at((0, 0)))[:3] == (10, 20, 30)
+    assert image._shared
+
+
+def test_reads_see_queued_fills(screen):
+    source, image = shared_image()
+    image.brush = (200, 0, 0)
+    image.draw(sim.shapes.rectangle(0, 0, 4, 4))
+    assert tuple(image.get_at((1, 1)))[:3] == (200, 0, 0)
+    assert tuple(source.get_at((1, 1)))[:3] == (10, 20, 30)
+
+
+def test_window_drawing_leaves_the_shared_surface_alone(screen):
+    source, image = shared_image()
+    window = image.window(0, 0, 8, 8)
+    window.brush = (0, 200, 0)
+    window.draw(sim.shapes.circle(4, 4, 3))
+    assert tuple(image.get_at((4, 4)))[:3] == (0, 200, 0)
+    assert tuple(source.get_at((4, 4)))[:3] == (10, 20, 30)
+
+
+def test_sprite_follows_its_sheet(screen, tmp_path):
+    path = tmp_path / "sheet.png"
+    surface = pygame.Surface((16, 8), pygame.SRCALPHA)
+    surface.fill((10, 20, 30))
+    pygame.image.save(surface, str(path))
+    sheet = sim.SpriteSheet(str(path), 2, 1)
+    sprite = sheet.sprite(1, 0)
+    for color in ((255, 0, 0), (0, 255, 0)):
+        # Drawing on the sheet un-shares it from the decode cache the first time
+        sheet.sheet.brush = color
+        sheet.sheet.draw(sim.shapes.circle(12, 4, 3))
+        screen.clear((0, 0, 0))
+        screen.blit(sprite, 0, 0)
+        screen.present()
+        assert tuple(sprite.get_at((4, 4)))[:3] == color
+        assert tuple(screen._window.get_at((4 * screen.scale, 4 * screen.scale)))[:3] == color
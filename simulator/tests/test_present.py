@@ -0,0 +1,42 @@
+"""Screen.present() must push every changed pixel to the window."""
+
+import badge_simulator as sim
+
+
+def window_pixel(screen, x, y):
+    return tuple(screen._window.get_at((x * screen.scale, y * screen.scale)))[:3]
+
+
+def frame_pixel(screen, x, y):
+    return tuple(screen._pixels().get_at((x, y)))[:3]
+
+
+def test_unchanged_frame_has_no_dirty_rects(screen):
+    for _ in range(2):
+        screen.clear((0, 0, 0))
+        screen.brush = (255, 0, 0)
+        screen.draw(sim.shapes.rectangle(10, 10, 20, 20))
+        previous, current = screen._presented, list(screen._draw_list)
+        screen.present()
+    assert sim.Screen._dirty_rects(previous, current) == []
+
+
+def test_image_filled_every_frame_is_presented(screen):
+    image = sim.Image(8, 8)
+    for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255)):
+        image.fill(color)
+        screen.clear((0, 0, 0))
+        screen.blit(image, 4, 4)
+        screen.present()
+        assert frame_pixel(screen, 6, 6) == color
+        assert window_pixel(screen, 6, 6) == color
+
+
+def test_xor_brush_without_clear_is_presented(screen):
+    screen.clear((0, 0, 0))
+    screen.present()
+    for _ in range(3):
+        screen.brush = sim._XorBrush((255, 255, 255, 255))
+        screen.draw(sim.shapes.rectangle(10, 10, 20, 20))
+        screen.present()
+        assert window_pixel(screen, 15, 15) == frame_pixel(screen, 15, 15)
@@ -0,0 +1,58 @@
+import types
+
+import pytest
+
+import badge_simulator as sim
+
+
+@pytest.fixture
+def io(tmp_path, monkeypatch):
+    io = types.SimpleNamespace(ticks=0)
+    monkeypatch.setattr(sim, "SIM_ROOT", str(tmp_path))
+    monkeypatch.setattr(sim, "_io_ref", io)
+    return io
+
+
+@pytest.fixture
+def writer(io, monkeypatch):
+    writer = sim._StateWriter(interval_ms=1000, binary=True)
+    monkeypatch.setattr(sim, "_state_writer", writer)
+    return writer
+
+
+def test_binary_round_trip():
+    value = {"name": "Mona", "level": 12, "hp": -3, "big": 2 ** 70, "ratio": 0.25,
+             "flags": [True, False, None], "items": [], "nested": {"a": [1, "b"]}}
+    raw = sim._pack_state(value)
+    assert sim._unpack_state(raw) == (value, len(raw))
+
+
+def test_binary_file_round_trip(writer):
+    assert sim.State.save("pet", {"happy": 3, "name": "Mona"})
+    writer.pending.clear()
+    loaded = {}
+    assert sim.State.load("pet", loaded)
+    assert loaded == {"happy": 3, "name": "Mona"}
+
+
+def test_saves_are_coalesced(writer, io):
+    for score in range(10):
+        sim.State.save("game", {"score": score})
+        io.ticks += 50
+    assert (writer.saves, writer.writes) == (10, 1)
+    writer.tick()
+    assert writer.writes == 1
+    io.ticks = 1000
+    writer.tick()
+    assert writer.writes == 2 and not writer.pending
+    loaded = {}
+    sim.State.load("game", loaded)
+    assert loaded == {"score": 9}
+
+
+def test_tick_after_reset_writes_pending(writer, io):
+    sim.State.save("game", {"score": 1})
+    sim.State.save("game", {"score": 2})
+    writer.reset()
+    writer.tick()
+    assert not writer.pending